@@ -0,0 +1,67 @@
+import threading
+import uuid
+
+class AccountRegistry:
+    """Accounts to reply to, indexed by lowercased username.
+
+    config['accounts_to_reply'] stays the saved form. Each change swaps a
+    fresh list into the config, so savers and the bot always see a
+    complete list. version increases on every change and, together with a
+    per-process token, forms the ETag of account listings.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.version = 0
+        self._token = uuid.uuid4().hex[:8]  # Keeps ETags from a previous process from matching
+        self._lock = threading.RLock()
+        self.reload()
+
+    def reload(self):
+        """Rebuild the index from config['accounts_to_reply'], e.g. after the config file was reloaded"""
+        with self._lock:
+            self._accounts = {account['username'].lower(): account for account in self.config['accounts_to_reply']}
+            self.version += 1
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def __contains__(self, username):
+        return username.lower() in self._accounts
+
+    def get(self, username):
+        return self._accounts.get(username.lower())
+
+    def etag(self):
+        return f"{self._token}-{self.version}"
+
+    def upsert(self, account):
+        """Add or replace an account, returns True if it was added"""
+        with self._lock:
+            key = account['username'].lower()
+            added = key not in self._accounts
+            self._accounts[key] = account
+            self._changed()
+            return added
+
+    def remove(self, username):
+        """Remove an account, returns False if there was none with that username"""
+        with self._lock:
+            if self._accounts.pop(username.lower(), None) is None:
+                return False
+            self._changed()
+            return True
+
+    def page(self, offset=0, limit=None, search=None):
+        """Return (accounts, total matching) in configured order, optionally filtered by a username substring"""
+        with self._lock:
+            accounts = list(self._accounts.values())
+        if search:
+            search = search.lower().lstrip('@')
+            accounts = [account for account in accounts if search in account['username'].lower()]
+        end = None if limit is None else offset + limit
+        return accounts[offset:end], len(accounts)
+
+    def _changed(self):
+        self.config['accounts_to_reply'] = list(self._accounts.values())
+        self.version += 1
@@ -0,0 +1,139 @@
+"""Measure reply throughput offline, running x_api.reply_to_tweets against fake X and OpenAI servers.
+
+Posts are not spaced out (the 1-5 minute pacing is set to 0) and cycles
+run back to back, so the numbers show what the pipeline itself can do.
+
+Usage: python benchmark.py --accounts 20 --tweets 5 --cycles 3 --x-latency 50 --openai-latency 400
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+import tweepy
+import gpt
+import http_pool
+import log
+import x_api
+from client_pool import ClientPool
+from pipeline import StageMetrics
+from fake_api import FakeOpenAIServer, FakeXServer, route_session
+from reply_store import MemoryReplyStore
+from response_cache import ResponseCache
+from scheduler import Scheduler
+from since_ids import SinceIdStore
+from user_cache import UserIdCache
+
+def run(accounts=10, tweets=5, cycles=3, x_latency=0.0, openai_latency=0.0, rate_limit=None, window=60,
+        error_rate=0.0, apps=1, use_gpt=True, fetch_concurrency=x_api.FETCH_CONCURRENCY,
+        generation_concurrency=x_api.GENERATION_CONCURRENCY, timeout=60.0):
+    """Run the cycles and wait for queued posts (up to timeout seconds), returns the measurements"""
+    x_server = FakeXServer(tweets_per_poll=tweets, latency=x_latency, rate_limit=rate_limit, window=window,
+                           error_rate=error_rate)
+    openai_server = FakeOpenAIServer(latency=openai_latency)
+    config = {
+        'accounts_to_reply': [{'username': f'account{i}', 'use_gpt': use_gpt,
+                               'custom_prompt': "Reply to this tweet: {tweet_text}", 'predefined_replies': ['Benchmark reply']}
+                              for i in range(accounts)],
+        'openai': {'api_key': 'benchmark', 'base_url': openai_server.base_url},
+        'fetch_concurrency': fetch_concurrency,
+        'generation_concurrency': generation_concurrency,
+        # Posts are not paced here, so nothing needs holding back for a later cycle
+        'max_queued_replies': accounts * tweets * cycles
+    }
+    with tempfile.TemporaryDirectory() as tmp, x_server, openai_server:
+        clients = _setup(config, tmp, x_server, apps)
+        started = time.monotonic()
+        for _ in range(cycles):
+            x_api.reply_to_tweets(clients, config, True)
+        deadline = started + timeout
+        while x_api.scheduler.pending() and time.monotonic() < deadline:
+            x_api.scheduler.run_for(min(1.0, deadline - time.monotonic()))
+        elapsed = time.monotonic() - started
+
+    replies = len(x_server.posted)
+    latencies = x_server.reply_latencies()
+    api_calls = x_server.total_calls() + openai_server.total_calls()
+    return {
+        "replies": replies,
+        "posted": list(x_server.posted),
+        "expected": accounts * tweets * cycles,
+        "unposted": x_api.scheduler.pending(),
+        "elapsed": elapsed,
+        "tweets_per_sec": replies / elapsed if elapsed else 0.0,
+        "latencies": latencies,
+        "x_calls": dict(x_server.calls),
+        "openai_calls": openai_server.total_calls(),
+        "calls_per_reply": api_calls / replies if replies else None,
+        "rate_limited": x_server.rate_limited,
+        "pipeline": x_api.pipeline_stats()
+    }
+
+def _setup(config, tmp, x_server, apps):
+    # Fresh stores in a temporary directory, so runs don't touch the bot's own state files
+    x_api.reply_store = MemoryReplyStore()
+    x_api.since_id_store = SinceIdStore(path=f"{tmp}/since_ids.json")
+    x_api.user_id_cache = UserIdCache(path=f"{tmp}/user_ids.json")
+    x_api.scheduler = Scheduler()
+    x_api.queued_tweet_ids.clear()
+    x_api.fetched_tweets.clear()
+    x_api.timeline_cursors.clear()
+    x_api.REPLY_WAIT_START = x_api.REPLY_WAIT_END = 0
+    x_api.configure_pipeline(config)
+    x_api.post_metrics = StageMetrics('post')
+    gpt.response_cache = ResponseCache(path=f"{tmp}/gpt_cache.json")
+    gpt.set_api_key(config['openai']['api_key'])
+    gpt.configure_http(config)
+    gpt.client = None
+
+    http_settings = http_pool.settings(config)
+    clients = ClientPool()
+    for i in range(apps):
+        client = tweepy.Client(bearer_token='benchmark', consumer_key='benchmark', consumer_secret='benchmark',
+                               access_token='benchmark', access_token_secret='benchmark')
+        route_session(client.session, x_server.url, **http_settings)
+        clients.add(f'app{i}', client)
+    return clients
+
+def report(results):
+    print(f"Replies:     {results['replies']} of {results['expected']} posted in {results['elapsed']:.2f}s"
+          + (f", {results['unposted']} still queued" if results['unposted'] else ""))
+    print(f"Throughput:  {results['tweets_per_sec']:.2f} tweets/s")
+    latencies = results['latencies']
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"Latency:     p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms (tweet served to reply posted)")
+    if results['calls_per_reply'] is not None:
+        print(f"API calls:   {results['calls_per_reply']:.2f} per reply")
+    calls = ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(results['x_calls'].items()))
+    print(f"X calls:     {calls or 'none'}, {results['rate_limited']} answered 429")
+    print(f"OpenAI:      {results['openai_calls']} completions")
+    for name, stage in results['pipeline'].items():
+        print(f"Stage {name + ':':9} {stage['processed']} done, {stage['errors']} failed, "
+              f"avg {stage['avg_ms'] or 0:.1f} ms, busy {stage['utilization']:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark twitta's reply pipeline against local fake APIs")
+    parser.add_argument('--accounts', type=int, default=10)
+    parser.add_argument('--tweets', type=int, default=5, help="New tweets per account per cycle")
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--x-latency', type=float, default=0.0, help="Milliseconds added to every X API call")
+    parser.add_argument('--openai-latency', type=float, default=0.0, help="Milliseconds added to every completion")
+    parser.add_argument('--rate-limit', type=int, default=None, help="Calls per endpoint per window, unlimited by default")
+    parser.add_argument('--window', type=int, default=60, help="Rate-limit window in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of X calls answered with a 429")
+    parser.add_argument('--apps', type=int, default=1, help="X apps in the client pool")
+    parser.add_argument('--predefined', action='store_true', help="Use predefined replies instead of completions")
+    parser.add_argument('--fetch-concurrency', type=int, default=x_api.FETCH_CONCURRENCY)
+    parser.add_argument('--generation-concurrency', type=int, default=x_api.GENERATION_CONCURRENCY)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for queued posts")
+    parser.add_argument('--verbose', action='store_true', help="Show INFO logs on the console")
+    args = parser.parse_args()
+    if not args.verbose:
+        log.log_writer.console_handler.setLevel(logging.WARNING)
+    report(run(args.accounts, args.tweets, args.cycles, args.x_latency / 1000, args.openai_latency / 1000,
+               args.rate_limit, args.window, args.error_rate, args.apps, not args.predefined,
+               args.fetch_concurrency, args.generation_concurrency, args.timeout))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime
+
+class BotState:
+    """Bot status and counters shared by bot workers and web request threads.
+
+    Writers serialize on a lock and swap in a new snapshot dict; readers
+    take the current snapshot without locking. A published snapshot is
+    never modified, so it can be serialized or compared while writers
+    carry on. Listeners are called with every new snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._snapshot = {
+            "running": False,
+            "start_time": None,
+            "status_message": "",
+            "error_count": 0,
+            "tweet_count": 0,
+            "last_tweet": None
+        }
+
+    def snapshot(self):
+        """The current state, treat it as read-only"""
+        return self._snapshot
+
+    @property
+    def running(self):
+        return self._snapshot["running"]
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l != listener]
+
+    def update(self, **changes):
+        """Set fields and publish the resulting snapshot"""
+        with self._lock:
+            snapshot = self._snapshot = {**self._snapshot, **changes}
+        self._notify(snapshot)
+
+    def increment(self, field, amount=1, **changes):
+        """Add amount to a counter field, optionally setting other fields in the same update"""
+        with self._lock:
+            changes[field] = self._snapshot[field] + amount
+            snapshot = self._snapshot = {**self._snapshot, **changes}
+        self._notify(snapshot)
+
+    def try_start(self):
+        """Mark the bot as running, False if it already was"""
+        with self._lock:
+            if self._snapshot["running"]:
+                return False
+            snapshot = self._snapshot = {**self._snapshot, "running": True, "start_time": datetime.now(),
+                                         "status_message": "Bot is running", "error_count": 0}
+        self._notify(snapshot)
+        return True
+
+    def try_stop(self, status_message="Bot has been stopped."):
+        """Mark the bot as stopped, False if it was not running"""
+        with self._lock:
+            if not self._snapshot["running"]:
+                return False
+            snapshot = self._snapshot = {**self._snapshot, "running": False, "status_message": status_message}
+        self._notify(snapshot)
+        return True
+
+    def set_status(self, message):
+        self.update(status_message=message)
+
+    def record_error(self, message):
+        self.increment("error_count", status_message=f"Error: {message}")
+
+    def record_reply(self, tweet_count):
+        self.update(tweet_count=tweet_count, last_tweet=datetime.now())
+
+    def _notify(self, snapshot):
+        for listener in self._listeners:
+            listener(snapshot)
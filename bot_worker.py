@@ -0,0 +1,85 @@
+import threading
+import x_api
+from log import api_logger as logger
+
+CYCLE_WAIT = 60  # Seconds between reply cycles
+STOP_TIMEOUT = 5  # Seconds to wait for the previous run to finish before starting a new one
+
+class BotWorker:
+    """Runs reply cycles on a background thread for the web interface.
+
+    Stopping sets an event that the cycle and the wait between cycles check,
+    so the thread exits within about a second unless an API request is in
+    flight. A post that has started finishes and queued posts stay in the
+    scheduler for the next run. Accounts can be swapped while running.
+    """
+
+    def __init__(self, client, config, state, cycle_wait=CYCLE_WAIT):
+        self.client = client
+        self.config = config
+        self.state = state
+        self.cycle_wait = cycle_wait
+        self._accounts = list(config['accounts_to_reply'])
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # Ends the wait between cycles early
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the worker thread, False if it is running or the last run is still winding down"""
+        with self._lock:
+            if self.state.running:
+                return False
+            if self.is_alive():
+                self._thread.join(STOP_TIMEOUT)
+                if self.is_alive():
+                    return False
+            if not self.state.try_start():
+                return False
+            self._stop.clear()
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._run, name='bot', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, wait=False):
+        """Ask the worker to stop, optionally waiting for the thread to exit. False if it was not running"""
+        if not self.state.try_stop():
+            return False
+        self._stop.set()
+        self._wake.set()
+        if wait and self._thread is not None:
+            self._thread.join(STOP_TIMEOUT)
+        return True
+
+    def restart(self):
+        self.stop(wait=True)
+        return self.start()
+
+    def reload_accounts(self, accounts):
+        """Use a new account list from the next scheduled cycle on"""
+        with self._lock:
+            self._accounts = list(accounts)
+        logger.info(f"Reloaded {len(self._accounts)} account(s)")
+
+    def _run(self):
+        logger.info("Bot thread started")
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.state.set_status("Running tweet reply cycle.")
+                with self._lock:
+                    config = {**self.config, 'accounts_to_reply': self._accounts}
+                x_api.reply_to_tweets(self.client, config, True, stop=self._stop)
+            except Exception as e:
+                self.state.record_error(str(e))
+            if self._stop.is_set():
+                break
+            self.state.set_status(f"Tweet reply cycle complete. Waiting {self.cycle_wait} seconds before next cycle...")
+            x_api.scheduler.run_for(self.cycle_wait, wake=self._wake)
+        x_api.reply_store.flush()
+        self.state.set_status("Bot has been stopped.")
+        logger.info("Bot thread stopped")
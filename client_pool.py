@@ -0,0 +1,132 @@
+import threading
+import time
+import tweepy.errors
+from http_pool import session_stats
+from log import api_logger as logger
+from rate_limit import RateLimitGovernor
+
+HEALTH_CHECK_INTERVAL = 5 * 60  # Seconds before a client taken out of rotation is tried again
+
+class _Member:
+    def __init__(self, name, client, governor):
+        self.name = name
+        self.client = client
+        self.governor = governor
+        self.healthy = True
+        self.error = None
+        self.check_at = 0
+        self.calls = 0
+
+class ClientPool:
+    """tweepy clients of one or more X apps, each with its own rate-limit governor.
+
+    acquire() hands out the healthy client with the most quota left for an
+    endpoint, so calls spread across apps and one app running dry does not
+    hold the others back. A client whose credentials are rejected is taken
+    out of rotation until check_health() can make an authenticated call
+    with it again.
+    """
+
+    def __init__(self, clock=time.time, check_interval=HEALTH_CHECK_INTERVAL):
+        self._clock = clock
+        self.check_interval = check_interval
+        self._members = []
+        self._lock = threading.Lock()
+
+    def add(self, name, client):
+        """Add a client, tracking its rate limits from the response headers it sees"""
+        governor = RateLimitGovernor(clock=self._clock)
+        governor.attach(client)
+        with self._lock:
+            self._members = self._members + [_Member(name, client, governor)]
+
+    def __len__(self):
+        return len(self._members)
+
+    def acquire(self, endpoint):
+        """Take a call to endpoint on the healthy client with the most quota left, None if none has any"""
+        with self._lock:
+            for member in sorted((m for m in self._members if m.healthy), key=lambda m: self._rank(m, endpoint)):
+                if member.governor.try_acquire(endpoint):
+                    member.calls += 1
+                    return member.client
+        return None
+
+    def delay(self, endpoint):
+        """Seconds until some client can call endpoint"""
+        with self._lock:
+            healthy = [m for m in self._members if m.healthy]
+            if healthy:
+                return min(m.governor.delay(endpoint) for m in healthy)
+            if not self._members:
+                return 0
+            return max(0, min(m.check_at for m in self._members) - self._clock())
+
+    def report_rate_limited(self, client, endpoint, fallback):
+        """Record a 429 from client, returns the seconds until some client can call endpoint again.
+
+        fallback is how long client waits when the response carried no reset time.
+        """
+        with self._lock:
+            member = self._member(client)
+        if member is not None:
+            member.governor.exhaust(endpoint, fallback)
+        return self.delay(endpoint)
+
+    def report_error(self, client, error):
+        """Take client out of rotation if error means its credentials were rejected, returns True if it was"""
+        if not isinstance(error, tweepy.errors.Unauthorized):
+            return False
+        with self._lock:
+            member = self._member(client)
+            if member is None or not member.healthy:
+                return False
+            member.healthy = False
+            member.error = str(error).replace('\n', ' ')
+            member.check_at = self._clock() + self.check_interval
+        logger.error(f"X app '{member.name}' failed authentication, taking it out of rotation: {member.error}")
+        return True
+
+    def check_health(self):
+        """Try clients out of rotation whose retry time has come, returns the number put back"""
+        with self._lock:
+            due = [m for m in self._members if not m.healthy and self._clock() >= m.check_at]
+        restored = 0
+        for member in due:
+            try:
+                member.client.get_me(user_auth=True)
+            except Exception as e:
+                with self._lock:
+                    member.error = str(e).replace('\n', ' ')
+                    member.check_at = self._clock() + self.check_interval
+                logger.warning(f"X app '{member.name}' is still failing, next check in {self.check_interval} seconds: {member.error}")
+                continue
+            with self._lock:
+                member.healthy = True
+                member.error = None
+            logger.info(f"X app '{member.name}' is back in rotation")
+            restored += 1
+        return restored
+
+    def rate_limits(self):
+        """(app name, endpoint, calls left) for every endpoint an app has reported limits for"""
+        with self._lock:
+            members = list(self._members)
+        return [(m.name, endpoint, remaining) for m in members for endpoint, remaining in m.governor.snapshot().items()]
+
+    def stats(self):
+        with self._lock:
+            return [{"name": m.name, "healthy": m.healthy, "calls": m.calls, "error": m.error,
+                     "connections": session_stats(m.client.session)} for m in self._members]
+
+    def _member(self, client):
+        for member in self._members:
+            if member.client is client:
+                return member
+        return None
+
+    @staticmethod
+    def _rank(member, endpoint):
+        # Unknown quota first (it is never held back), then most remaining, then fewest calls handed out
+        remaining = member.governor.remaining(endpoint)
+        return (remaining is not None, -(remaining or 0), member.calls)
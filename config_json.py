@@ -1,16 +1,32 @@
+import copy
 import json
 import os
 import sys
 import secrets
-import jsonschema
-from jsonschema import validate
-from werkzeug.security import generate_password_hash
+import threading
+import utils
 from log import app_logger as logger
 from utils import __version__
 
 __default_prompt__ = "Make sure not to include commentary or anything extra in your response, just raw text. Reply to this tweet: {tweet_text}"
 __config_file__ = "config.json"
 
+SAVE_DELAY = 1.0  # Seconds to wait for more changes before writing the config file
+WATCH_INTERVAL = 5.0  # Seconds between checks for edits made outside twitta
+
+# Credentials of one X app
+twitter_credentials_schema = {
+    "type": "object",
+    "properties": {
+        "bearer_token": {"type": "string"},
+        "consumer_key": {"type": "string"},
+        "consumer_secret": {"type": "string"},
+        "access_token": {"type": "string"},
+        "access_token_secret": {"type": "string"},
+    },
+    "required": ["bearer_token", "consumer_key", "consumer_secret", "access_token", "access_token_secret"],
+}
+
 # Define the JSON schema
 config_schema = {
     "type": "object",
@@ -18,21 +34,20 @@ config_schema = {
         "version": {
             "type": "string"
         },
-        "twitter": {
-            "type": "object",
-            "properties": {
-                "bearer_token": {"type": "string"},
-                "consumer_key": {"type": "string"},
-                "consumer_secret": {"type": "string"},
-                "access_token": {"type": "string"},
-                "access_token_secret": {"type": "string"},
-            },
-            "required": ["bearer_token", "consumer_key", "consumer_secret", "access_token", "access_token_secret"],
+        "twitter": twitter_credentials_schema,
+        "twitter_apps": {
+            "type": "array",  # Extra credential sets, calls are spread across all apps
+            "items": {
+                **twitter_credentials_schema,
+                "properties": {**twitter_credentials_schema["properties"], "name": {"type": "string"}}
+            }
         },
         "openai": {
             "type": "object",
             "properties": {
                 "api_key": {"type": "string"},
+                "near_duplicate_cache": {"type": "boolean"},
+                "base_url": {"type": "string"},
             },
             "required": ["api_key"],
         },
@@ -52,6 +67,20 @@ config_schema = {
                 "required": ["username", "use_gpt"],
             },
         },
+        "fetch_concurrency": {"type": "integer", "minimum": 1},
+        "generation_concurrency": {"type": "integer", "minimum": 1},
+        "max_queued_replies": {"type": "integer", "minimum": 1},
+        "reply_store": {"type": "string", "enum": ["sqlite", "memory"]},
+        "log_format": {"type": "string", "enum": ["text", "json"]},
+        "http": {
+            "type": "object",
+            "properties": {
+                "pool_size": {"type": "integer", "minimum": 1},
+                "connect_timeout": {"type": "number", "exclusiveMinimum": 0},
+                "read_timeout": {"type": "number", "exclusiveMinimum": 0},
+                "http2": {"type": "boolean"}
+            }
+        },
         "web_interface": {
             "type": "object",
             "properties": {
@@ -61,7 +90,10 @@ config_schema = {
                 },
                 "secret_key": {"type": "string"},
                 "port": {"type": "integer", "minimum": 1, "maximum": 65535},
-                "log_level": {"type": "string", "enum": ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]}
+                "log_level": {"type": "string", "enum": ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]},
+                "server": {"type": "string", "enum": ["development", "production"]},
+                "threads": {"type": "integer", "minimum": 1},
+                "metrics_token": {"type": "string"}  # Bearer token for Prometheus scrapes of /metrics
             },
             "required": ["credentials", "secret_key", "port", "log_level"]
         }
@@ -71,6 +103,7 @@ config_schema = {
 
 def setup_web_interface(config):
     """Set up web interface configuration"""
+    from werkzeug.security import generate_password_hash
     if 'web_interface' not in config:
         logger.info("Setting up web interface configuration...")
         
@@ -125,6 +158,7 @@ def setup_web_interface(config):
 
 def add_web_user(config):
     """Add a new web interface user"""
+    from werkzeug.security import generate_password_hash
     if 'web_interface' not in config:
         setup_web_interface(config)
         return
@@ -174,6 +208,7 @@ def remove_web_user(config):
 
 def change_web_password(config):
     """Change password for a web interface user"""
+    from werkzeug.security import generate_password_hash
     if 'web_interface' not in config or not config['web_interface']['credentials']:
         logger.warning("No web interface users configured!")
         return False
@@ -246,7 +281,7 @@ def _create_config():
 
 def add_new_account(config):
     new_account = input("Enter the Twitter account to reply to (without @): ")
-    if any(account_info['username'] == new_account for account_info in config['accounts_to_reply']):
+    if any(account['username'].lower() == new_account.lower() for account in config['accounts_to_reply']):
         logger.error(f"Unable to add user {new_account}! Account already exists in config.")
         return
 
@@ -291,13 +326,116 @@ def _load_config_json():
 def _save_config(config):
     config_path = _get_config_path()
     logger.info(f"Saving configuration to {config_path}")
-    with open(config_path, 'w') as config_file:
-        json.dump(config, config_file, indent=4)
+    utils.atomic_write_json(config_path, config, indent=4)
 
 def _validate_config(config):
+    import jsonschema  # Slow to import, only needed once a config is loaded
     try:
-        validate(instance=config, schema=config_schema)
+        jsonschema.validate(instance=config, schema=config_schema)
     except jsonschema.ValidationError as e:
         logger.error(f"Configuration file is invalid: {e.message}")
         return False
     return True
+
+class ConfigStore:
+    """Keeps a config dict and its file in sync for long-running processes.
+
+    save_soon() coalesces bursts of changes into one atomic write after
+    SAVE_DELAY seconds. Edits made to the file by anything else are
+    detected by its mtime and size. They are validated, applied to the
+    same dict in place, and passed to the listeners.
+    Hold `lock` while changing the config so a save never sees it half-updated.
+    """
+
+    def __init__(self, config, path=None, save_delay=SAVE_DELAY):
+        self.config = config
+        self.path = path or _get_config_path()
+        self.save_delay = save_delay
+        self.lock = threading.RLock()
+        self._timer = None
+        self._listeners = []
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._signature = self._file_signature()
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def save_soon(self):
+        """Write the config after save_delay seconds, together with any other changes made meanwhile"""
+        with self.lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save(self):
+        """Write the config now, replacing any pending delayed save"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            data = copy.deepcopy(self.config)
+            try:
+                utils.atomic_write_json(self.path, data, indent=4)
+            except OSError as e:
+                logger.error(f"Failed to save configuration to {self.path}: {e}")
+                raise
+            self._signature = self._file_signature()
+        logger.info("Configuration saved successfully")
+
+    def flush(self):
+        """Write a pending delayed save now"""
+        with self.lock:
+            if self._timer is not None:
+                self.save()
+
+    def check_for_changes(self):
+        """Reload the file if it was edited outside this store, returns True if the config changed"""
+        with self.lock:
+            signature = self._file_signature()
+            if signature == self._signature or self._timer is not None:
+                return False  # Unchanged, or about to be overwritten by our pending save
+            self._signature = signature
+            try:
+                with open(self.path) as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable configuration file {self.path}: {e}")
+                return False
+            if not _validate_config(config):
+                logger.warning(f"Ignoring invalid edit to {self.path}")
+                return False
+            # Key by key, readers that don't take the lock never see an empty config
+            self.config.update(config)
+            for key in [key for key in self.config if key not in config]:
+                del self.config[key]
+        logger.info(f"Reloaded configuration edited outside twitta from {self.path}")
+        for listener in self._listeners:
+            listener(self.config)
+        return True
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """Check for external edits every interval seconds on a background thread"""
+        if self._watcher is not None:
+            return
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    logger.error(f"Error checking configuration file for changes: {e}")
+        self._watcher = threading.Thread(target=watch, name='config-watch', daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        """Stop watching and write any pending changes"""
+        self._stop_watching.set()
+        self.flush()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
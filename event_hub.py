@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+class EventHub:
+    """Fan-out of server events to any number of subscribers (e.g. SSE streams).
+
+    Producers publish once; every subscriber gets its own bounded queue. A
+    subscriber that falls SUBSCRIBER_QUEUE_SIZE events behind loses new
+    events instead of holding up producers.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                self.dropped += 1
+
+def format_sse(event, data):
+    """Encode an event in the text/event-stream wire format"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class EventHubLogHandler(logging.Handler):
+    """Publishes formatted log records to a hub as 'log' events.
+
+    sources maps logger names to the source named in the event, records of
+    other loggers are ignored. Nothing is formatted while no one is subscribed.
+    """
+
+    def __init__(self, hub, sources):
+        super().__init__()
+        self.hub = hub
+        self.sources = sources
+
+    def emit(self, record):
+        source = self.sources.get(record.name)
+        if source is None or not self.hub.subscriber_count():
+            return
+        try:
+            self.hub.publish('log', {"source": source, "line": self.format(record)})
+        except Exception:
+            self.handleError(record)
@@ -0,0 +1,258 @@
+"""Local stand-ins for the X API v2 and OpenAI endpoints twitta calls, for tests and benchmark.py.
+
+Each server listens on a free port on 127.0.0.1 from a background thread
+and can add latency, send x-rate-limit-* headers and answer 429 to a
+share of requests:
+
+    with FakeXServer(tweets_per_poll=5) as x_server, FakeOpenAIServer(latency=0.5) as openai_server:
+        route_session(client.session, x_server.url)
+        ...
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from http_pool import CONNECT_TIMEOUT, POOL_SIZE, READ_TIMEOUT, TimeoutHTTPAdapter
+from rate_limit import RATE_LIMIT_WINDOW, endpoint_key
+
+X_API_HOST = 'https://api.twitter.com'  # Where tweepy sends every request
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+    def do_GET(self):
+        self.server.fake.handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.fake.handle(self, 'POST')
+
+    def log_message(self, *args):
+        pass
+
+class _FakeServer:
+    """Serves the endpoints in self.routes, counting calls per endpoint.
+
+    rate_limit is the number of calls each endpoint allows per window
+    seconds (None for no limit headers). error_rate is the share of calls
+    answered with a 429 regardless of the remaining quota.
+    """
+
+    def __init__(self, latency=0.0, rate_limit=None, window=RATE_LIMIT_WINDOW, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.error_rate = error_rate
+        self.calls = {}
+        self.rate_limited = 0
+        self.routes = {}
+        self._buckets = {}  # endpoint: [calls made, window reset (epoch seconds)]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    def handle(self, handler, method):
+        parts = urlsplit(handler.path)
+        endpoint = endpoint_key(method, parts.path)
+        route = self.routes.get(endpoint)
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = json.loads(handler.rfile.read(length)) if length else {}
+        if route is None:
+            self._respond(handler, 404, {"title": "Not Found Error", "detail": f"No route for {endpoint}"})
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            headers, allowed = self._take_quota(endpoint)
+            if allowed and self.error_rate and self._random.random() < self.error_rate:
+                allowed = False
+            if not allowed:
+                self.rate_limited += 1
+        if not allowed:
+            self._respond(handler, 429, {"title": "Too Many Requests", "detail": "Too Many Requests", "status": 429}, headers)
+            return
+        status, payload = route(parts.path, parse_qs(parts.query), body)
+        self._respond(handler, status, payload, headers)
+
+    def _take_quota(self, endpoint):
+        if self.rate_limit is None:
+            return {}, True
+        now = time.time()
+        bucket = self._buckets.get(endpoint)
+        if bucket is None or now >= bucket[1]:
+            bucket = self._buckets[endpoint] = [0, int(now + self.window) + 1]
+        allowed = bucket[0] < self.rate_limit
+        if allowed:
+            bucket[0] += 1
+        headers = {'x-rate-limit-limit': self.rate_limit,
+                   'x-rate-limit-remaining': self.rate_limit - bucket[0],
+                   'x-rate-limit-reset': bucket[1]}
+        return headers, allowed
+
+    @staticmethod
+    def _respond(handler, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, str(value))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+class FakeXServer(_FakeServer):
+    """The X API v2 endpoints twitta uses.
+
+    Every first-page timeline request returns tweets_per_poll new tweets for
+    that user. Posted replies are timed against the moment the tweet they
+    answer was first served, see reply_latencies().
+    """
+
+    def __init__(self, tweets_per_poll=5, **kwargs):
+        super().__init__(**kwargs)
+        self.tweets_per_poll = tweets_per_poll
+        self.posted = []  # (in_reply_to_tweet_id, text)
+        self._user_ids = {}
+        self._next_id = 1000
+        self._new_tweets = {}  # user ID: tweets returned by the last first-page request, newest first
+        self._served_at = {}
+        self._reply_latencies = []
+        self.routes = {
+            'GET /2/users/by': self._get_users,
+            'GET /2/users/me': self._get_me,
+            'GET /2/users/:id/tweets': self._get_users_tweets,
+            'POST /2/tweets': self._create_tweet
+        }
+
+    def reply_latencies(self):
+        """Seconds from a tweet being served to the reply to it being posted"""
+        with self._lock:
+            return list(self._reply_latencies)
+
+    def _allocate_id(self):
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _user(self, username):
+        with self._lock:
+            if username.lower() not in self._user_ids:
+                self._next_id += 1
+                self._user_ids[username.lower()] = self._next_id
+            user_id = self._user_ids[username.lower()]
+        return {"id": str(user_id), "name": username, "username": username}
+
+    def _get_users(self, path, query, body):
+        usernames = query.get('usernames', [''])[0].split(',')
+        return 200, {"data": [self._user(username) for username in usernames if username]}
+
+    def _get_me(self, path, query, body):
+        return 200, {"data": self._user('twitta')}
+
+    def _get_users_tweets(self, path, query, body):
+        user_id = int(path.split('/')[3])
+        max_results = int(query.get('max_results', ['10'])[0])
+        offset = int(query.get('pagination_token', ['0'])[0])
+        if offset == 0:
+            now = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+            tweets = []
+            for _ in range(self.tweets_per_poll):
+                tweet_id = self._allocate_id()
+                tweets.append({"id": str(tweet_id), "text": f"Tweet {tweet_id}", "created_at": now,
+                               "edit_history_tweet_ids": [str(tweet_id)]})
+            tweets.reverse()
+            served_at = time.monotonic()
+            with self._lock:
+                self._new_tweets[user_id] = tweets
+                self._served_at.update((int(tweet['id']), served_at) for tweet in tweets)
+        with self._lock:
+            tweets = self._new_tweets.get(user_id, [])
+        page = tweets[offset:offset + max_results]
+        if not page:
+            return 200, {"meta": {"result_count": 0}}
+        meta = {"result_count": len(page), "newest_id": page[0]['id'], "oldest_id": page[-1]['id']}
+        if offset + max_results < len(tweets):
+            meta['next_token'] = str(offset + max_results)
+        return 200, {"data": page, "meta": meta}
+
+    def _create_tweet(self, path, query, body):
+        tweet_id = self._allocate_id()
+        in_reply_to = int(body.get('reply', {}).get('in_reply_to_tweet_id', 0))
+        with self._lock:
+            self.posted.append((in_reply_to, body.get('text', '')))
+            served_at = self._served_at.get(in_reply_to)
+            if served_at is not None:
+                self._reply_latencies.append(time.monotonic() - served_at)
+        return 201, {"data": {"id": str(tweet_id), "text": body.get('text', ''), "edit_history_tweet_ids": [str(tweet_id)]}}
+
+class FakeOpenAIServer(_FakeServer):
+    """The chat completions endpoint, answering every prompt with a short reply"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.routes = {'POST /v1/chat/completions': self._create_completion}
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def _create_completion(self, path, query, body):
+        with self._lock:
+            completion_id = sum(self.calls.values())
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        return 200, {
+            "id": f"chatcmpl-{completion_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', ''),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"Reply {completion_id} to {len(prompt)} characters"}}],
+            "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 5, "total_tokens": len(prompt.split()) + 5}
+        }
+
+class RedirectHTTPAdapter(TimeoutHTTPAdapter):
+    """Sends requests meant for X_API_HOST to base_url instead, keeping the path and query"""
+
+    def __init__(self, base_url, timeout, **kwargs):
+        self.base_url = base_url.rstrip('/')
+        super().__init__(timeout, **kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = self.base_url + request.url[len(X_API_HOST):]
+        return super().send(request, **kwargs)
+
+def route_session(session, base_url, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, **_):
+    """Point a tweepy client's session at a FakeXServer, with the same pool settings as http_pool.configure_session"""
+    adapter = RedirectHTTPAdapter(base_url, (connect_timeout, read_timeout), pool_maxsize=pool_size)
+    session.mount(X_API_HOST, adapter)
+    return adapter
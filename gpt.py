@@ -1,15 +1,111 @@
-import openai
+import http_pool
+import importlib.util
+import metrics
+import random
+import threading
+import time
 from log import app_logger as logger
+from response_cache import ResponseCache
 
-def get_chatgpt_response(prompt):
+MODEL = "gpt-4o-mini"
+FALLBACK_RESPONSE = "Sorry, I couldn't process that."
+
+# Per-request timeout and retry policy
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 20
+
+# Completions keyed on (model, prompt), replaced with a configured cache in twitta._setup_api
+response_cache = ResponseCache()
+api_key = None  # Set from the config, handed to the client when it is created
+base_url = None  # An OpenAI-compatible endpoint from config['openai']['base_url'], api.openai.com if unset
+
+# One openai.OpenAI client and connection pool shared by every generate worker, created on the first request
+client = None
+connections = http_pool.ConnectionCounter()
+completion_latency = metrics.histogram('twitta_openai_request_seconds', "OpenAI completion latency, per attempt")
+http_settings = http_pool.settings({})
+_client_lock = threading.Lock()
+
+def set_api_key(key):
+    global api_key
+    api_key = key
+
+def configure_http(config):
+    """Endpoint, pool size, connect timeout and HTTP/2 from the config, before the first request"""
+    global http_settings, base_url
+    http_settings = http_pool.settings(config)
+    base_url = config['openai'].get('base_url')
+
+def configure_cache(config):
+    global response_cache
+    response_cache = ResponseCache(near_duplicate=config['openai'].get('near_duplicate_cache', False))
+
+def get_chatgpt_response(prompt, timeout=REQUEST_TIMEOUT, use_cache=True):
+    if use_cache:
+        cached = response_cache.get(MODEL, prompt)
+        if cached is not None:
+            logger.info(f"Using cached OpenAI response (cache stats: {response_cache.stats()})")
+            return cached
+    response = _request_completion(prompt, timeout)
+    if response != FALLBACK_RESPONSE:
+        response_cache.put(MODEL, prompt, response)
+    return response
+
+def _get_client():
+    global client
+    with _client_lock:
+        if client is None:
+            client = _create_client()
+        return client
+
+def _create_client():
+    import httpx
+    import openai  # Slow to import, only needed once a reply is generated
+    http2 = http_settings['http2']
+    if http2 and importlib.util.find_spec('h2') is None:
+        logger.warning("HTTP/2 requested for OpenAI but the h2 package is not installed, using HTTP/1.1 keep-alive")
+        http2 = False
+    pool_size = http_settings['pool_size']
+    timeout = openai.Timeout(REQUEST_TIMEOUT, connect=http_settings['connect_timeout'])
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                          keepalive_expiry=http_pool.KEEPALIVE_EXPIRY)
+    http_client = openai.DefaultHttpxClient(http2=http2, limits=limits, timeout=timeout,
+                                            event_hooks={'request': [connections.on_request]})
+    # Retries are handled in _request_completion, with jitter
+    return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0, timeout=timeout)
+
+def _request_completion(prompt, timeout):
     try:
-        response = openai.chat.completions.create(model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}])
-        if response.choices and len(response.choices) > 0:
-            return response.choices[0].message.content
-        else:
-            logger.error("No response received from OpenAI.")
-            return "Sorry, I couldn't process that."
+        import openai
+        completions = _get_client().chat.completions
     except Exception as e:
-        logger.error(f"Error getting response from OpenAI: {e}")
-        return "Sorry, I couldn't process that."
\ No newline at end of file
+        logger.error(f"Unable to set up the OpenAI client: {e}")
+        return FALLBACK_RESPONSE
+    retryable_errors = (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with completion_latency.time():
+                response = completions.create(model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=openai.Timeout(timeout, connect=http_settings['connect_timeout']))
+            if response.choices and len(response.choices) > 0:
+                return response.choices[0].message.content
+            else:
+                logger.error("No response received from OpenAI.")
+                return FALLBACK_RESPONSE
+        except retryable_errors as e:
+            if attempt == MAX_RETRIES:
+                logger.error(f"Error getting response from OpenAI after {MAX_RETRIES + 1} attempts: {e}")
+                return FALLBACK_RESPONSE
+            delay = _retry_delay(attempt)
+            logger.warning(f"Transient error from OpenAI: {e}. Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+        except Exception as e:
+            logger.error(f"Error getting response from OpenAI: {e}")
+            return FALLBACK_RESPONSE
+
+def _retry_delay(attempt):
+    # Exponential backoff with full jitter so parallel requests don't retry in lockstep
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
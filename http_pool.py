@@ -0,0 +1,74 @@
+import threading
+from requests.adapters import HTTPAdapter
+
+# Connection pool and timeout defaults, overridable under config['http']
+POOL_SIZE = 16  # Connections kept open per host, at least the number of fetch and generate workers
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+KEEPALIVE_EXPIRY = 60  # Seconds an idle OpenAI connection is kept open
+
+def settings(config):
+    """Pool size, timeouts and HTTP/2 from config['http'], with defaults for missing keys"""
+    http = config.get('http', {})
+    return {
+        "pool_size": http.get('pool_size', POOL_SIZE),
+        "connect_timeout": http.get('connect_timeout', CONNECT_TIMEOUT),
+        "read_timeout": http.get('read_timeout', READ_TIMEOUT),
+        "http2": http.get('http2', False)
+    }
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout, tweepy sends its requests without one"""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+def configure_session(session, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, **_):
+    """Mount a sized keep-alive pool with timeouts on a requests session, e.g. a tweepy client's"""
+    adapter = TimeoutHTTPAdapter((connect_timeout, read_timeout), pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
+
+def session_stats(session):
+    """Requests sent and connections opened by a requests session, the rest reused a kept-alive connection"""
+    requests = connections = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests += pool.num_requests
+                connections += pool.num_connections
+    return _stats(requests, connections)
+
+class ConnectionCounter:
+    """Counts requests and new connections of an httpx client through the httpcore trace extension.
+
+    Install on_request as a request event hook.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def on_request(self, request):
+        request.extensions['trace'] = self._trace
+        with self._lock:
+            self.requests += 1
+
+    def stats(self):
+        return _stats(self.requests, self.connections)
+
+    def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.connections += 1
+
+def _stats(requests, connections):
+    return {"requests": requests, "connections": connections, "reused": max(0, requests - connections)}
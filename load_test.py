@@ -0,0 +1,86 @@
+"""Measure requests per second against the dashboard's /api/status endpoint.
+
+Usage: python load_test.py --url http://localhost:5000 --user admin --password secret
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+def login(host, port, username, password):
+    """Log in through the login form and return the session cookie"""
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    body = urlencode({'username': username, 'password': password})
+    connection.request('POST', '/login', body=body, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    response = connection.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie')
+    connection.close()
+    if response.status != 302 or not cookie:
+        raise SystemExit(f"Login failed with status {response.status}")
+    return cookie.split(';', 1)[0]
+
+def worker(host, port, path, headers, deadline, latencies, errors):
+    # One keep-alive connection per worker, reopened after an error
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.monotonic() - started)
+    connection.close()
+
+def run(url, username, password, concurrency, duration, path='/api/status', gzip=False):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    headers = {'Cookie': login(host, port, username, password)}
+    if gzip:
+        headers['Accept-Encoding'] = 'gzip'
+
+    latencies, errors = [], []  # list.append is atomic, no lock needed
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=worker, args=(host, port, path, headers, deadline, latencies, errors))
+               for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+def report(latencies, errors, elapsed):
+    print(f"Requests:    {len(latencies)} ok, {len(errors)} failed in {elapsed:.1f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.1f} requests/s")
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"Latency:     p50 {cuts[49] * 1000:.1f} ms, p95 {cuts[94] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms")
+    if errors:
+        print(f"Errors:      {sorted(set(map(str, errors)))}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the twitta web interface")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--path', default='/api/status')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run for")
+    parser.add_argument('--gzip', action='store_true', help="Send Accept-Encoding: gzip")
+    args = parser.parse_args()
+    report(*run(args.url, args.user, args.password, args.concurrency, args.duration, args.path, args.gzip))
+
+if __name__ == '__main__':
+    main()
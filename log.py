@@ -1,35 +1,232 @@
+import atexit
+import copy
 import logging
 import os
+import queue
 from datetime import datetime
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from log_format import JsonLinesFormatter, text_formatter
+from log_index import RotatingIndexedFileHandler
 
 # Create logs directory if it doesn't exist
 if not os.path.exists('logs'):
     os.makedirs('logs')
 
+# Log file formats, the console always uses text
+LOG_FORMATS = {
+    'text': text_formatter,
+    'json': JsonLinesFormatter
+}
+
+# Records are handed to a single writer thread through a bounded queue.
+# When it is full, DEBUG/INFO records are dropped and WARNING and above
+# wait up to LOG_BLOCK_TIMEOUT seconds for room before being dropped too.
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 500
+LOG_BLOCK_TIMEOUT = 1.0
+
+# Log files are rotated at midnight or once they reach LOG_MAX_BYTES,
+# rotated segments are gzip compressed and deleted after LOG_RETENTION_DAYS
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_RETENTION_DAYS = 14
+
+class _BatchFlushMixin:
+    """Skips the flush after every record, the writer thread flushes once per batch"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class BatchedFileHandler(_BatchFlushMixin, RotatingIndexedFileHandler):
+    pass
+
+class BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+class LogQueueHandler(QueueHandler):
+    """Enqueues records for the writer thread, tagged with the log file they belong to"""
+
+    def __init__(self, log_queue, target):
+        super().__init__(log_queue)
+        self.target = target
+        self.dropped = 0
+
+    def emit(self, record):
+        console = synchronous_console
+        if console is not None and record.levelno >= console.level:
+            # Written before returning, so it shows ahead of any input() prompt that follows
+            console.handle(record)
+            console.flush_batch()
+            record.console_written = True
+        super().emit(record)
+
+    def prepare(self, record):
+        # QueueHandler.prepare folds the traceback into the message and drops exc_info,
+        # keep it apart in exc_text so the JSON format can write its "exception" field
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        record.log_target = self.target
+        return record
+
+    def enqueue(self, record):
+        if self._put(record):
+            if self.dropped:
+                self._report_dropped()
+        else:
+            self.dropped += 1
+
+    def _put(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            try:
+                self.queue.put(record, timeout=LOG_BLOCK_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _report_dropped(self):
+        record = logging.LogRecord(self.target, logging.WARNING, __file__, 0,
+                                   f"Dropped {self.dropped} log record(s), log queue was full", None, None)
+        record.log_target = self.target
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            pass
+
+class LogWriter(QueueListener):
+    """Single writer thread that routes queued records to their log file and the console.
+
+    Up to LOG_BATCH_SIZE waiting records are written per batch and each
+    handler is flushed once at the end of the batch.
+    """
+
+    def __init__(self, log_queue, console_handler):
+        super().__init__(log_queue)
+        self.console_handler = console_handler
+        self.routes = {}  # target: file handler
+        self.listeners = []  # Handlers that see every record, e.g. the dashboard's event streams
+
+    def add_listener(self, handler):
+        self.listeners = self.listeners + [handler]
+
+    def remove_listener(self, handler):
+        self.listeners = [listener for listener in self.listeners if listener is not handler]
+
+    def add_route(self, target, file_handler):
+        self.routes[target] = file_handler
+
+    def set_formatter(self, formatter):
+        """Change the formatter of every log file"""
+        for handler in self.routes.values():
+            handler.setFormatter(formatter)
+
+    def handle(self, record):
+        # Records already written by a synchronous console only go to their file
+        handlers = [] if getattr(record, 'console_written', False) else [self.console_handler]
+        if record.log_target in self.routes:
+            handlers.append(self.routes[record.log_target])
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        for listener in self.listeners:
+            if record.levelno >= listener.level:
+                listener.handle(record)
+        return handlers
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Wait for room, a dropped sentinel would hang stop()
+
+    def _monitor(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            written = set()
+            stopping = False
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                    continue
+                try:
+                    written.update(self.handle(record))
+                except Exception:
+                    pass  # Never let one bad record kill the writer thread
+            for handler in written:
+                handler.flush_batch()
+            for _ in batch:
+                self.queue.task_done()
+            if stopping:
+                return
+
 def setup_logger(name, log_file, level=logging.INFO):
     """Set up a new logger with consistent formatting"""
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    formatter = LOG_FORMATS[log_format]()
     
-    file_handler = logging.FileHandler(f'logs/{log_file}', delay=False)
+    file_handler = BatchedFileHandler(f'logs/{log_file}', delay=False,
+                                      max_bytes=LOG_MAX_BYTES, retention_days=LOG_RETENTION_DAYS)
     file_handler.setFormatter(formatter)
-    
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
+    log_writer.add_route(name, file_handler)
     
     logger = logging.getLogger(name)
     logger.setLevel(level)
     logger.handlers = []  # Clear existing handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)  # Add console handler
+    logger.addHandler(LogQueueHandler(log_queue, name))
     logger.propagate = False
     
     return logger
 
+def _setup_console_handler():
+    console_handler = BatchedStreamHandler(sys.stdout)
+    console_handler.setFormatter(text_formatter())
+    return console_handler
+
+def set_synchronous_console(enabled):
+    """Write the console from the logging thread itself instead of the writer thread.
+
+    Meant for the interactive console menu and manual approval, where a
+    warning must show before the next input() prompt. Headless and web runs
+    keep it off so the bot and request threads never wait on the terminal.
+    """
+    global synchronous_console
+    synchronous_console = log_writer.console_handler if enabled else None
+
+def set_log_format(name):
+    """Switch the log files between 'text' and 'json' (one JSON object per line)"""
+    global log_format
+    if name not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {name}")
+    log_format = name
+    log_writer.set_formatter(LOG_FORMATS[name]())
+
+log_format = 'text'
+
+# Shared queue and writer thread, stopped at exit so queued records are written out
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+log_writer = LogWriter(log_queue, _setup_console_handler())
+synchronous_console = None  # Console handler written by the logging threads, see set_synchronous_console
+
 # Main application logger
 app_logger = setup_logger('twitta', 'twitta.log')
 web_logger = setup_logger('twitta_web', 'web.log')
-api_logger = setup_logger('twitta_api', 'api.log')
\ No newline at end of file
+api_logger = setup_logger('twitta_api', 'api.log')
+
+log_writer.start()
+atexit.register(log_writer.stop)
@@ -0,0 +1,74 @@
+import json
+import logging
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+TIMESTAMP_LENGTH = 19
+
+# Optional structured fields, passed with logger.info(..., extra={...})
+STRUCTURED_FIELDS = ('event', 'account', 'tweet_id', 'latency_ms', 'ip')
+
+# JSON lines always start with the timestamp so they sort and seek like text lines
+JSON_PREFIX = '{"time": "'
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, logger, level, message and any structured fields"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, LOG_DATE_FORMAT),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text  # Formatted before the record was queued
+        return json.dumps(entry, ensure_ascii=False)
+
+def text_formatter():
+    return logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+def is_json_line(line):
+    return line.startswith(JSON_PREFIX)
+
+def line_timestamp(line):
+    """The 'YYYY-mm-dd HH:MM:SS' timestamp of a text or JSON log line, None for continuation lines"""
+    start = len(JSON_PREFIX) if is_json_line(line) else 0
+    prefix = line[start:start + TIMESTAMP_LENGTH]
+    # Timestamps are fixed width and sortable as text, no need to parse them
+    if len(prefix) == TIMESTAMP_LENGTH and prefix[4] == '-' and prefix[10] == ' ' and prefix[:4].isdigit():
+        return prefix
+    return None
+
+def has_level(line, level):
+    """Whether a log line was written at level, without parsing it"""
+    if is_json_line(line):
+        return f'"level": "{level}"' in line
+    return f" - {level} - " in line
+
+def parse_line(line):
+    """Turn a JSON or text log line into a dict of fields"""
+    if is_json_line(line):
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    parts = line.split(' - ', 3)
+    if len(parts) == 4 and line_timestamp(line):
+        return {"time": parts[0], "logger": parts[1], "level": parts[2], "message": parts[3]}
+    return {"message": line}
+
+def to_text_line(line):
+    """Render a JSON log line in the text format, text lines are returned unchanged"""
+    if not is_json_line(line):
+        return line
+    entry = parse_line(line)
+    if 'time' not in entry:
+        return line
+    return f"{entry['time']} - {entry.get('logger', '')} - {entry.get('level', '')} - {entry.get('message', '')}"
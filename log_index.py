@@ -0,0 +1,237 @@
+import bisect
+import glob
+import gzip
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from log_format import LOG_DATE_FORMAT, has_level, line_timestamp
+
+CHECKPOINT_INTERVAL = 16 * 1024  # Bytes of log between (timestamp, offset) checkpoints
+SEGMENT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+def index_path(log_path):
+    """Path of the sidecar checkpoint file for a log file or compressed segment"""
+    if log_path.endswith('.gz'):
+        log_path = log_path[:-len('.gz')]
+    return log_path + '.idx'
+
+def log_segments(log_path):
+    """Compressed rotated segments of a log, oldest first, followed by the active file"""
+    return sorted(glob.glob(glob.escape(log_path) + '.*.gz')) + [log_path]
+
+def segment_time(segment_path):
+    """Time a rotated segment was closed, or None for the active log file"""
+    if not segment_path.endswith('.gz'):
+        return None
+    stamp = segment_path[:-len('.gz')].rsplit('.', 1)[-1]
+    try:
+        return datetime.strptime(stamp.split('_')[0], SEGMENT_TIME_FORMAT)
+    except ValueError:
+        return None
+
+def open_segment(segment_path):
+    if segment_path.endswith('.gz'):
+        return gzip.open(segment_path, 'rb')
+    return open(segment_path, 'rb')
+
+class IndexedFileHandler(logging.FileHandler):
+    """FileHandler that appends (timestamp, byte offset) checkpoints to a sidecar .idx file"""
+
+    def __init__(self, filename, mode='a', encoding='utf-8', delay=False, checkpoint_interval=CHECKPOINT_INTERVAL):
+        super().__init__(filename, mode=mode, encoding=encoding, delay=delay)
+        self.index_path = index_path(self.baseFilename)
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = None
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        offset = self.stream.tell()
+        if self._last_checkpoint is None or offset - self._last_checkpoint >= self.checkpoint_interval:
+            try:
+                with open(self.index_path, 'a') as index_file:
+                    index_file.write(f"{int(record.created)} {offset}\n")
+                self._last_checkpoint = offset
+            except OSError:
+                self.handleError(record)
+        super().emit(record)
+
+class RotatingIndexedFileHandler(IndexedFileHandler):
+    """Indexed file handler that rotates by size and at midnight.
+
+    The closed file is renamed to <log>.<YYYYmmdd-HHMMSS>, gzip compressed
+    and kept, together with its checkpoint index, for retention_days. The
+    active file keeps its name so tailers (fail2ban, the dashboard) follow
+    it across rotations.
+    """
+
+    def __init__(self, filename, max_bytes=0, retention_days=0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self._day = self._file_day()
+
+    def emit(self, record):
+        try:
+            if self._should_rollover(record):
+                self.do_rollover(datetime.fromtimestamp(record.created))
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+
+    def _should_rollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        size = self.stream.tell()
+        if size == 0:
+            self._day = date.fromtimestamp(record.created)
+            return False
+        if date.fromtimestamp(record.created) != self._day:
+            return True
+        return bool(self.max_bytes) and size >= self.max_bytes
+
+    def do_rollover(self, rollover_time=None):
+        """Close the active file and replace it with an empty one, archiving the old contents"""
+        rollover_time = rollover_time or datetime.now()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        # Segments are named after the first record that did not fit, which orders them by log time
+        base_segment = f"{self.baseFilename}.{rollover_time.strftime(SEGMENT_TIME_FORMAT)}"
+        segment = base_segment
+        suffix = 1
+        while os.path.exists(segment + '.gz'):
+            segment = f"{base_segment}_{suffix}"
+            suffix += 1
+        os.replace(self.baseFilename, segment)
+        if os.path.exists(self.index_path):
+            os.replace(self.index_path, index_path(segment))
+        with open(segment, 'rb') as source, gzip.open(segment + '.gz', 'wb') as archive:
+            shutil.copyfileobj(source, archive)
+        os.remove(segment)
+        self._last_checkpoint = None
+        self._day = rollover_time.date()
+        self._prune_segments()
+
+    def _prune_segments(self):
+        if not self.retention_days:
+            return
+        cutoff = datetime.now().timestamp() - self.retention_days * 24 * 60 * 60
+        for segment in log_segments(self.baseFilename)[:-1]:
+            if os.path.getmtime(segment) < cutoff:
+                for path in (segment, index_path(segment)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _file_day(self):
+        try:
+            return date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            return date.today()
+
+class LogIndex:
+    """Reads time ranges of a log file or segment by binary-searching its checkpoint index.
+
+    Checkpoints are loaded incrementally, only index lines appended since the
+    previous query are read. Without an index the whole file is scanned.
+    """
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = index_path(log_path)
+        self._timestamps = []
+        self._offsets = []
+        self._index_read = 0
+        self._lock = threading.Lock()
+
+    def seek_offset(self, start):
+        """Byte offset of the last checkpoint written before datetime start"""
+        with self._lock:
+            self._refresh()
+            position = bisect.bisect_left(self._timestamps, start.timestamp()) - 1
+            offset = self._offsets[position] if position >= 0 else 0
+        if self.log_path.endswith('.gz'):
+            return offset  # Archives never change, offsets are into the uncompressed stream
+        try:
+            if offset > os.path.getsize(self.log_path):
+                return 0  # Log was truncated or replaced after the checkpoint was written
+        except OSError:
+            return 0
+        return offset
+
+    def read(self, start=None, end=None, level=None, limit=1000, match=None):
+        """Return up to limit lines logged in [start, end] at the given level, and whether more matched.
+
+        match, if given, is called with the first line of each entry and decides whether it is included.
+        """
+        start_key = start.strftime(LOG_DATE_FORMAT) if start else None
+        end_key = end.strftime(LOG_DATE_FORMAT) if end else None
+        level = level.upper() if level else None
+        lines = []
+        include = False  # Whether the current entry (and its continuation lines) matched
+        with open_segment(self.log_path) as f:
+            f.seek(self.seek_offset(start) if start else 0)
+            for raw in f:
+                line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+                timestamp = line_timestamp(line)
+                if timestamp is not None:
+                    if end_key and timestamp > end_key:
+                        break
+                    include = ((not start_key or timestamp >= start_key)
+                               and (not level or has_level(line, level))
+                               and (not match or match(line)))
+                if include:
+                    if len(lines) == limit:
+                        return lines, True
+                    lines.append(line)
+        return lines, False
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.index_path)
+        except OSError:
+            size = 0
+        if size < self._index_read:
+            # Index was rewritten, start over
+            self._timestamps, self._offsets, self._index_read = [], [], 0
+        if size == self._index_read:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_read)
+            data = f.read(size - self._index_read)
+        complete = data[:data.rfind(b'\n') + 1]
+        for entry in complete.splitlines():
+            timestamp, offset = entry.split()
+            self._timestamps.append(int(timestamp))
+            self._offsets.append(int(offset))
+        self._index_read += len(complete)
+
+def read_log_range(log_path, start=None, end=None, level=None, limit=1000, indexes=None, match=None):
+    """Like LogIndex.read, across the rotated segments of a log followed by the active file.
+
+    indexes caches this log's LogIndex objects between calls, keyed by segment path.
+    """
+    indexes = {} if indexes is None else indexes
+    segments = log_segments(log_path)
+    for stale in set(indexes) - set(segments):
+        del indexes[stale]  # Pruned by retention
+    lines = []
+    segment_start = None
+    for segment in segments:
+        segment_end = segment_time(segment)
+        skip = (start and segment_end and segment_end < start) or (end and segment_start and segment_start > end)
+        segment_start = segment_end
+        if skip or not os.path.exists(segment):
+            continue
+        if segment not in indexes:
+            indexes[segment] = LogIndex(segment)
+        found, truncated = indexes[segment].read(start=start, end=end, level=level, match=match,
+                                                 limit=None if limit is None else limit - len(lines))
+        lines.extend(found)
+        if truncated:
+            return lines, True
+    return lines, False
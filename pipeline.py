@@ -0,0 +1,156 @@
+import metrics
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+METRICS_WINDOW = 300  # Seconds of completed work behind the throughput and utilization figures
+
+stage_latency = metrics.histogram('twitta_stage_seconds', "Time spent on one item by each pipeline stage", ['stage'])
+
+class StageMetrics:
+    """Completed items and busy time of one pipeline stage, over a sliding window.
+
+    Named stages also feed the twitta_stage_seconds histogram.
+    """
+
+    def __init__(self, name=None, window=METRICS_WINDOW, clock=time.monotonic):
+        self.name = name
+        self.window = window
+        self.processed = 0
+        self.errors = 0
+        self._clock = clock
+        self._completed = deque()  # (finished at, seconds busy)
+        self._lock = threading.Lock()
+
+    def record(self, duration, failed=False):
+        with self._lock:
+            self.processed += 1
+            self.errors += failed
+            self._completed.append((self._clock(), duration))
+            self._trim()
+        if self.name is not None:
+            stage_latency.observe(duration, stage=self.name)
+
+    def stats(self, workers, queue_depth, in_flight=0):
+        with self._lock:
+            self._trim()
+            count = len(self._completed)
+            busy = sum(duration for _, duration in self._completed)
+            return {
+                "workers": workers,
+                "queue_depth": queue_depth,
+                "in_flight": in_flight,
+                "processed": self.processed,
+                "errors": self.errors,
+                "per_minute": round(count * 60 / self.window, 2),
+                "avg_ms": round(busy / count * 1000, 1) if count else None,
+                "utilization": round(min(1.0, busy / (workers * self.window)), 3)  # Near 1.0: this stage limits the run
+            }
+
+    def _trim(self):
+        cutoff = self._clock() - self.window
+        while self._completed and self._completed[0][0] < cutoff:
+            self._completed.popleft()
+
+class Stage:
+    """A named pool of worker threads fed through a bounded queue.
+
+    submit() blocks while the queue is full, so a slow stage holds back the
+    stages feeding it instead of buffering without limit. Threads start on
+    the first submit.
+    """
+
+    def __init__(self, name, handler, workers, queue_size):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.metrics = StageMetrics(name)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, *args):
+        """Queue handler(*args), returns a Future for its result"""
+        self._start()
+        future = Future()
+        self._queue.put((future, args))
+        return future
+
+    def map(self, items, window):
+        """Run handler over argument tuples with at most window outstanding, yielding results in order"""
+        pending = deque()
+        try:
+            for args in items:
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+                pending.append(self.submit(*args))
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()  # Left over when the consumer stops early
+
+    def stats(self):
+        return self.metrics.stats(self.workers, self._queue.qsize(), self._in_flight)
+
+    def close(self):
+        """Stop the worker threads once the queued work is done"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'{self.name}-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._in_flight += 1
+            started = time.monotonic()
+            try:
+                result = self.handler(*args)
+            except BaseException as e:
+                self._finished(started, failed=True)
+                future.set_exception(e)
+            else:
+                self._finished(started)
+                future.set_result(result)
+
+    def _finished(self, started, failed=False):
+        # Counted before the result is published, so stats are current for whoever waits on it
+        self.metrics.record(time.monotonic() - started, failed)
+        with self._lock:
+            self._in_flight -= 1
+
+def chain(future, stage, *args):
+    """Submit stage.handler(*args, result) once future resolves, returns a Future for the stage's result"""
+    chained = Future()
+    def forward(done):
+        if done.cancelled():
+            chained.cancel()
+        elif done.exception() is not None:
+            chained.set_exception(done.exception())
+        else:
+            stage.submit(*args, done.result()).add_done_callback(lambda inner: _copy_result(inner, chained))
+    future.add_done_callback(forward)
+    return chained
+
+def _copy_result(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
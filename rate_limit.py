@@ -0,0 +1,103 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+from log import api_logger as logger
+
+_ID_SEGMENT = re.compile(r'(?<!^)/\d+(?=/|$)')  # Numeric path segments after the API version
+
+# X API rate-limit windows are 15 minutes long
+RATE_LIMIT_WINDOW = 15 * 60
+
+def endpoint_key(method, url):
+    """Normalize a request into an endpoint name, e.g. 'GET /2/users/:id/tweets'"""
+    return f"{method.upper()} {_ID_SEGMENT.sub('/:id', urlsplit(url).path)}"
+
+class _Bucket:
+    def __init__(self, limit, remaining, reset_at):
+        self.limit = limit
+        self.tokens = remaining
+        self.reset_at = reset_at
+
+class RateLimitGovernor:
+    """Per-endpoint token buckets kept in sync with x-rate-limit-* response headers.
+
+    Every response seen through an attached client resets the bucket for
+    its endpoint to the server's remaining count. Between responses, each
+    granted call takes one token locally so concurrent callers cannot
+    overshoot. Endpoints that have not reported limits yet are never held
+    back.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def attach(self, client):
+        """Track rate-limit headers of every request made by a tweepy client"""
+        client.session.hooks['response'].append(self._on_response)
+
+    def update(self, endpoint, limit, remaining, reset_at):
+        """Record the server-reported quota for endpoint"""
+        with self._lock:
+            self._buckets[endpoint] = _Bucket(limit, remaining, reset_at)
+
+    def delay(self, endpoint):
+        """Seconds until a call to endpoint fits inside its limit (0 if it fits now)"""
+        with self._lock:
+            bucket = self._refilled(endpoint)
+            if bucket is None or bucket.tokens > 0:
+                return 0
+            return max(0, bucket.reset_at - self._clock())
+
+    def try_acquire(self, endpoint):
+        """Take a token for a call to endpoint, returns False if the quota is spent"""
+        with self._lock:
+            bucket = self._refilled(endpoint)
+            if bucket is None:
+                return True
+            if bucket.tokens <= 0:
+                return False
+            bucket.tokens -= 1
+            return True
+
+    def exhaust(self, endpoint, seconds):
+        """Hold endpoint back for seconds after a 429, unless its response headers already set a reset time"""
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is not None and bucket.tokens <= 0 and bucket.reset_at > self._clock():
+                return
+            limit = bucket.limit if bucket else 1  # Unknown until a response reports it
+            self._buckets[endpoint] = _Bucket(limit, 0, self._clock() + seconds)
+
+    def snapshot(self):
+        """Calls left in the current window for every endpoint that has reported limits"""
+        with self._lock:
+            return {endpoint: self._refilled(endpoint).tokens for endpoint in list(self._buckets)}
+
+    def remaining(self, endpoint):
+        """Calls left for endpoint in the current window, or None if unknown"""
+        with self._lock:
+            bucket = self._refilled(endpoint)
+            return bucket.tokens if bucket else None
+
+    def _refilled(self, endpoint):
+        bucket = self._buckets.get(endpoint)
+        if bucket and bucket.tokens <= 0 and self._clock() >= bucket.reset_at:
+            # Window reset, assume a full quota until the next response confirms it
+            bucket.tokens = bucket.limit
+            bucket.reset_at = self._clock() + RATE_LIMIT_WINDOW
+        return bucket
+
+    def _on_response(self, response, *args, **kwargs):
+        headers = response.headers
+        try:
+            limit = int(headers['x-rate-limit-limit'])
+            remaining = int(headers['x-rate-limit-remaining'])
+            reset_at = int(headers['x-rate-limit-reset'])
+        except (KeyError, ValueError):
+            return
+        endpoint = endpoint_key(response.request.method, response.request.url)
+        self.update(endpoint, limit, remaining, reset_at)
+        logger.debug(f"Rate limit for {endpoint}: {remaining}/{limit} remaining, resets at {reset_at}")
@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from log import api_logger as logger
+
+REPLY_DB_FILE = os.path.join('data', 'replies.db')
+REPLY_RETENTION = 30 * 24 * 60 * 60  # Tweets older than this are never re-fetched, forget them
+CACHE_SIZE = 10000
+FLUSH_BATCH_SIZE = 20
+FLUSH_INTERVAL = 30
+PRUNE_INTERVAL = 60 * 60
+
+class MemoryReplyStore:
+    """Bounded in-memory record of replied tweet IDs, lost on restart"""
+
+    def __init__(self, max_size=CACHE_SIZE, retention=REPLY_RETENTION):
+        self.max_size = max_size
+        self.retention = retention
+        self._replied = OrderedDict()  # tweet_id: replied_at, oldest first
+        self._lock = threading.Lock()
+
+    def __contains__(self, tweet_id):
+        with self._lock:
+            return int(tweet_id) in self._replied
+
+    def add(self, tweet_id):
+        """Record tweet_id as replied to"""
+        with self._lock:
+            self._replied[int(tweet_id)] = time.time()
+            self._replied.move_to_end(int(tweet_id))
+            while len(self._replied) > self.max_size:
+                self._replied.popitem(last=False)
+
+    def count(self):
+        """Number of replied tweets currently remembered"""
+        with self._lock:
+            return len(self._replied)
+
+    def prune(self):
+        """Forget replies older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            while self._replied and next(iter(self._replied.values())) < cutoff:
+                self._replied.popitem(last=False)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class SqliteReplyStore:
+    """Replied tweet IDs persisted in SQLite (WAL mode) behind an in-memory LRU cache.
+
+    Writes are buffered and committed in batches of FLUSH_BATCH_SIZE, every
+    FLUSH_INTERVAL seconds, or when flush() is called at the end of a cycle.
+    """
+
+    def __init__(self, path=REPLY_DB_FILE, retention=REPLY_RETENTION, cache_size=CACHE_SIZE):
+        self.path = path
+        self.retention = retention
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # Recently seen replied tweet IDs
+        self._pending = {}  # tweet_id: replied_at, not yet committed
+        self._count = 0
+        self._last_flush = time.time()
+        self._last_prune = 0
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def __contains__(self, tweet_id):
+        tweet_id = int(tweet_id)
+        with self._lock:
+            if tweet_id in self._cache:
+                self._cache.move_to_end(tweet_id)
+                return True
+            if tweet_id in self._pending:
+                return True
+            row = self._connect().execute(
+                "SELECT 1 FROM replied_tweets WHERE tweet_id = ?", (tweet_id,)).fetchone()
+            if row:
+                self._remember(tweet_id)
+            return row is not None
+
+    def add(self, tweet_id):
+        """Record tweet_id as replied to, committing once enough writes are buffered"""
+        tweet_id = int(tweet_id)
+        with self._lock:
+            if tweet_id in self:
+                return
+            self._pending[tweet_id] = time.time()
+            self._remember(tweet_id)
+            self._count += 1
+            if len(self._pending) >= FLUSH_BATCH_SIZE or time.time() - self._last_flush >= FLUSH_INTERVAL:
+                self.flush()
+
+    def count(self):
+        """Number of replied tweets within the retention period"""
+        with self._lock:
+            self._connect()
+            return self._count
+
+    def prune(self):
+        """Delete replies older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                pruned = [row[0] for row in conn.execute("SELECT tweet_id FROM replied_tweets WHERE replied_at < ?", (cutoff,))]
+                conn.execute("DELETE FROM replied_tweets WHERE replied_at < ?", (cutoff,))
+            # Keep the cache in step with the table, or pruned IDs would still read as replied
+            for tweet_id in pruned:
+                self._cache.pop(tweet_id, None)
+            deleted = len(pruned)
+            self._count -= deleted
+            self._last_prune = time.time()
+            if deleted:
+                logger.info(f"Pruned {deleted} replied tweet(s) older than {self.retention // 86400} days")
+
+    def flush(self):
+        """Commit buffered replies in a single transaction"""
+        with self._lock:
+            conn = self._connect()
+            if self._pending:
+                with conn:
+                    conn.executemany("INSERT OR IGNORE INTO replied_tweets (tweet_id, replied_at) VALUES (?, ?)",
+                                     self._pending.items())
+                self._pending.clear()
+            self._last_flush = time.time()
+            if time.time() - self._last_prune >= PRUNE_INTERVAL:
+                self.prune()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, tweet_id):
+        self._cache[tweet_id] = None
+        self._cache.move_to_end(tweet_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _connect(self):
+        # Opened lazily so importing x_api does not touch the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS replied_tweets ("
+                         "tweet_id INTEGER PRIMARY KEY, replied_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS replied_tweets_replied_at ON replied_tweets (replied_at)")
+            conn.commit()
+            self._conn = conn
+            self._count = conn.execute("SELECT COUNT(*) FROM replied_tweets").fetchone()[0] + len(self._pending)
+        return self._conn
+
+def create_reply_store(config):
+    """Build the reply store selected by config['reply_store'] (default: sqlite)"""
+    if config.get('reply_store', 'sqlite') == 'memory':
+        return MemoryReplyStore()
+    return SqliteReplyStore()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import utils
+from collections import OrderedDict
+from log import app_logger as logger
+
+CACHE_FILE = os.path.join('data', 'gpt_cache.json')
+CACHE_TTL = 24 * 60 * 60
+CACHE_SIZE = 1000
+SAVE_INTERVAL = 60
+
+_URL = re.compile(r'https?://\S+')
+_MENTION = re.compile(r'(\brt\s+)?@\w+:?')  # Mentions, including retweet prefixes
+_NON_WORD = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text):
+    """Reduce text to its wording so reposts and quotes of the same tweet compare equal"""
+    text = _URL.sub(' ', text.lower())
+    text = _MENTION.sub(' ', text)
+    text = _NON_WORD.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+class ResponseCache:
+    """Size-bounded LRU cache of completions keyed on (model, prompt), persisted to disk.
+
+    With near_duplicate enabled prompts are normalized before hashing, so
+    prompts that differ only in case, punctuation, links or mentions share
+    a cached response.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_size=CACHE_SIZE, near_duplicate=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.near_duplicate = near_duplicate
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key: (response, created_at), least recently used first
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        self._load()
+
+    def key(self, model, prompt):
+        if self.near_duplicate:
+            prompt = normalize_text(prompt)
+        return hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def get(self, model, prompt):
+        """Return the cached response for prompt, or None on a miss"""
+        key = self.key(model, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model, prompt, response):
+        """Cache a response, evicting the least recently used entries beyond max_size"""
+        key = self.key(model, prompt)
+        with self._lock:
+            self._entries[key] = (response, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            save_due = time.time() - self._last_save >= SAVE_INTERVAL
+        if save_due:
+            self.save()
+
+    def stats(self):
+        """Hit/miss counters for reporting"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "size": len(self._entries)
+            }
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        with self._lock:
+            self._last_save = time.time()
+            if not self._dirty:
+                return
+            data = [[key, response, created_at] for key, (response, created_at) in self._entries.items()]
+            self._dirty = False
+        try:
+            utils.atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.error(f"Failed to save OpenAI response cache to {self.path}: {e}")
+
+    def _load(self):
+        try:
+            data = utils.read_json(self.path)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable OpenAI response cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, response, created_at in data[-self.max_size:]:
+            if now - created_at < self.ttl:
+                self._entries[key] = (response, created_at)
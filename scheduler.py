@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import threading
+import time
+from log import api_logger as logger
+
+class Scheduler:
+    """Timer heap of queued actions with a next-eligible time per key.
+
+    A key names an action, optionally scoped to an account, e.g. ('post',)
+    or ('fetch', 'username'). Deferring a key holds back every task queued
+    under it while tasks under other keys keep running.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._heap = []  # (due, sequence, key, action, args)
+        self._sequence = itertools.count()
+        self._eligible_at = {}
+        self._lock = threading.Lock()
+
+    def defer(self, key, seconds):
+        """Make key ineligible for the next `seconds` seconds"""
+        with self._lock:
+            eligible_at = self._clock() + seconds
+            self._eligible_at[key] = max(self._eligible_at.get(key, 0), eligible_at)
+
+    def delay(self, key):
+        """Seconds until key becomes eligible again (0 if it is eligible now)"""
+        with self._lock:
+            return max(0, self._eligible_at.get(key, 0) - self._clock())
+
+    def is_ready(self, key):
+        return self.delay(key) == 0
+
+    def call_when_ready(self, key, action, *args):
+        """Queue action(*args) to run once key is eligible"""
+        with self._lock:
+            due = max(self._clock(), self._eligible_at.get(key, 0))
+            heapq.heappush(self._heap, (due, next(self._sequence), key, action, args))
+
+    def pending(self):
+        """Number of queued tasks"""
+        with self._lock:
+            return len(self._heap)
+
+    def next_due(self):
+        """Seconds until the next queued task is due, or None if nothing is queued"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0, self._heap[0][0] - self._clock())
+
+    def run_pending(self, stop=None):
+        """Run every task that is due now, returns the number of tasks run.
+
+        If stop (a threading.Event) is set, no further tasks are started and the rest stay queued.
+        """
+        ran = 0
+        while stop is None or not stop.is_set():
+            with self._lock:
+                now = self._clock()
+                if not self._heap or self._heap[0][0] > now:
+                    return ran
+                due, sequence, key, action, args = heapq.heappop(self._heap)
+                eligible_at = self._eligible_at.get(key, 0)
+                if eligible_at > now:
+                    # Key was deferred after this task was queued, keep its place in line
+                    heapq.heappush(self._heap, (eligible_at, sequence, key, action, args))
+                    continue
+            try:
+                action(*args)
+            except Exception as e:
+                logger.error(f"Scheduled task {key} failed: {e}")
+            ran += 1
+        return ran
+
+    def run_for(self, seconds, wake=None):
+        """Run tasks as they come due for `seconds` seconds, sleeping in between.
+
+        Returns early once wake (a threading.Event) is set, waiting on it instead of sleeping.
+        """
+        deadline = self._clock() + seconds
+        while True:
+            self.run_pending(stop=wake)
+            remaining = deadline - self._clock()
+            if remaining <= 0 or (wake is not None and wake.is_set()):
+                return
+            next_due = self.next_due()
+            timeout = remaining if next_due is None else min(remaining, next_due)
+            if wake is None:
+                self._sleep(timeout)
+            else:
+                wake.wait(timeout)
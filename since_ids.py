@@ -0,0 +1,52 @@
+import os
+import threading
+import utils
+from log import api_logger as logger
+
+SINCE_IDS_FILE = os.path.join('data', 'since_ids.json')
+
+class SinceIdStore:
+    """Persistent per-account high-water mark of the newest tweet seen"""
+
+    def __init__(self, path=SINCE_IDS_FILE):
+        self.path = path
+        self._since_ids = {}  # str(user_id): newest tweet ID
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def get(self, user_id):
+        """Return the newest tweet ID seen for user_id, or None if never polled"""
+        with self._lock:
+            return self._since_ids.get(str(user_id))
+
+    def advance(self, user_id, tweet_id):
+        """Raise the high-water mark for user_id, never moving it backwards"""
+        tweet_id = int(tweet_id)
+        with self._lock:
+            current = self._since_ids.get(str(user_id))
+            if current is None or tweet_id > current:
+                self._since_ids[str(user_id)] = tweet_id
+                self._dirty = True
+
+    def save(self):
+        """Write the high-water marks to disk if they changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self._since_ids)
+            self._dirty = False
+        try:
+            utils.atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.error(f"Failed to save since IDs to {self.path}: {e}")
+
+    def _load(self):
+        try:
+            data = utils.read_json(self.path)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable since ID file {self.path}: {e}")
+            return
+        self._since_ids = {user_id: int(tweet_id) for user_id, tweet_id in data.items()}
@@ -3,6 +3,10 @@ class AccountManager {
         this.modal = new bootstrap.Modal(document.getElementById('accountModal'));
         this.isEditing = false;
         this.botRunning = false;
+        this.pageSize = 100;
+        this.offset = 0;
+        this.total = 0;
+        this.search = '';
         this.init();
     }
 
@@ -16,17 +20,49 @@ class AccountManager {
             e.preventDefault();
             this.saveAccount();
         });
+
+        let searchTimer = null;
+        document.getElementById('accountSearch').addEventListener('input', (e) => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                this.search = e.target.value.trim();
+                this.offset = 0;
+                this.loadAccounts();
+            }, 250);
+        });
+        document.getElementById('prevPage').addEventListener('click', () => {
+            this.offset = Math.max(0, this.offset - this.pageSize);
+            this.loadAccounts();
+        });
+        document.getElementById('nextPage').addEventListener('click', () => {
+            if (this.offset + this.pageSize < this.total) {
+                this.offset += this.pageSize;
+                this.loadAccounts();
+            }
+        });
     }
 
     loadAccounts() {
-        fetch('/api/accounts')
+        const params = new URLSearchParams({ offset: this.offset, limit: this.pageSize });
+        if (this.search) params.set('q', this.search);
+        // The browser revalidates with If-None-Match, an unchanged page comes back as 304 from its cache
+        fetch(`/api/accounts?${params}`, { cache: 'no-cache' })
             .then(response => response.json())
             .then(data => {
                 this.botRunning = data.running;
+                this.total = data.total;
                 this.renderAccounts(data.accounts);
+                this.renderPager(data.accounts.length);
             });
     }
 
+    renderPager(count) {
+        document.getElementById('pageInfo').textContent = count
+            ? `${this.offset + 1}-${this.offset + count} of ${this.total}` : '';
+        document.getElementById('prevPage').disabled = this.offset === 0;
+        document.getElementById('nextPage').disabled = this.offset + this.pageSize >= this.total;
+    }
+
     renderAccounts(accounts) {
         const tbody = document.getElementById('accountsTable');
         tbody.innerHTML = accounts.length ? accounts.map(account => this.createAccountRow(account)).join('') 
@@ -58,10 +94,12 @@ class AccountManager {
 
     editAccount(username) {
         this.isEditing = true;
-        fetch('/api/accounts')
-            .then(response => response.json())
-            .then(data => {
-                const account = data.accounts.find(acc => acc.username === username);
+        fetch(`/api/accounts/${encodeURIComponent(username)}`)
+            .then(response => {
+                if (!response.ok) throw new Error(response.statusText);
+                return response.json();
+            })
+            .then(account => {
                 this.populateForm(account);
                 this.modal.show();
             })
@@ -104,9 +142,6 @@ class AccountManager {
         if (data.status === 'success') {
             this.modal.hide();
             this.loadAccounts();
-            if (data.restart_required) {
-                document.getElementById('restartAlert').style.display = 'block';
-            }
         } else {
             alert(data.message);
         }
@@ -127,9 +162,6 @@ class AccountManager {
     handleDeleteResponse(data) {
         if (data.status === 'success') {
             this.loadAccounts();
-            if (data.restart_required) {
-                document.getElementById('restartAlert').style.display = 'block';
-            }
         } else {
             alert(data.message);
         }
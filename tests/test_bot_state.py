@@ -0,0 +1,40 @@
+import threading
+from bot_state import BotState
+
+def test_updates_replace_the_snapshot():
+    state = BotState()
+    before = state.snapshot()
+    state.set_status("working")
+    after = state.snapshot()
+    assert before["status_message"] == "" and after["status_message"] == "working"
+    assert before is not after
+
+def test_start_and_stop_only_once():
+    state = BotState()
+    assert state.try_start()
+    assert not state.try_start()
+    assert state.running
+    assert state.try_stop()
+    assert not state.try_stop()
+    assert state.snapshot()["status_message"] == "Bot has been stopped."
+
+def test_concurrent_increments_are_not_lost():
+    state = BotState()
+    def record_errors():
+        for _ in range(1000):
+            state.record_error("failed")
+    threads = [threading.Thread(target=record_errors) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state.snapshot()["error_count"] == 4000
+
+def test_listeners_receive_snapshots():
+    state = BotState()
+    received = []
+    state.add_listener(received.append)
+    state.record_reply(3)
+    state.remove_listener(received.append)
+    state.record_reply(4)
+    assert [snapshot["tweet_count"] for snapshot in received] == [3]
@@ -0,0 +1,57 @@
+import threading
+import time
+import pytest
+import x_api
+from bot_state import BotState
+from bot_worker import BotWorker
+from reply_store import MemoryReplyStore
+
+@pytest.fixture
+def cycles(monkeypatch):
+    """Record the accounts of each reply cycle instead of calling the API"""
+    seen = []
+    ran = threading.Event()
+    def reply_to_tweets(client, config, auto_reply, stop=None):
+        seen.append([account['username'] for account in config['accounts_to_reply']])
+        ran.set()
+    monkeypatch.setattr(x_api, 'reply_to_tweets', reply_to_tweets)
+    monkeypatch.setattr(x_api, 'reply_store', MemoryReplyStore())
+    return seen, ran
+
+def make_worker(cycle_wait=300):
+    return BotWorker(None, {'accounts_to_reply': [{'username': 'first'}]}, BotState(), cycle_wait=cycle_wait)
+
+def test_stop_interrupts_the_wait_between_cycles(cycles):
+    seen, ran = cycles
+    worker = make_worker()
+    assert worker.start()
+    assert ran.wait(5)
+    assert not worker.start()
+
+    started = time.monotonic()
+    assert worker.stop(wait=True)
+    assert time.monotonic() - started < 1
+    assert not worker.is_alive()
+    assert not worker.state.running
+    assert worker.state.snapshot()['status_message'] == "Bot has been stopped."
+
+def test_reload_accounts_is_used_by_the_next_scheduled_cycle(cycles):
+    seen, ran = cycles
+    worker = make_worker(cycle_wait=1)
+    worker.start()
+    assert ran.wait(5)
+    ran.clear()
+    worker.reload_accounts([{'username': 'second'}])
+    assert not ran.wait(0.2)  # The wait between cycles is not cut short
+    assert ran.wait(5)
+    worker.stop(wait=True)
+    assert seen[:2] == [['first'], ['second']]
+
+def test_restart_runs_a_new_thread(cycles):
+    seen, ran = cycles
+    worker = make_worker()
+    worker.start()
+    first_thread = worker._thread
+    assert worker.restart()
+    assert worker._thread is not first_thread and worker.state.running
+    worker.stop(wait=True)
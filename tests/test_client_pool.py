@@ -0,0 +1,77 @@
+import requests
+import tweepy
+from types import SimpleNamespace
+from client_pool import ClientPool
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class MockClient:
+    def __init__(self):
+        self.session = requests.Session()
+        self.authorized = True
+
+    def get_me(self, **kwargs):
+        if not self.authorized:
+            raise unauthorized()
+
+def unauthorized():
+    return tweepy.errors.Unauthorized(SimpleNamespace(status_code=401, reason='Unauthorized', json=lambda: {}))
+
+def test_calls_go_to_the_client_with_most_quota():
+    first, second = MockClient(), MockClient()
+    pool = ClientPool()
+    pool.add('first', first)
+    pool.add('second', second)
+    # Unknown quota is spread round-robin
+    assert [pool.acquire('POST /2/tweets') for _ in range(2)] == [first, second]
+
+    pool._members[0].governor.update('POST /2/tweets', limit=100, remaining=1, reset_at=2**40)
+    pool._members[1].governor.update('POST /2/tweets', limit=100, remaining=5, reset_at=2**40)
+    assert pool.acquire('POST /2/tweets') is second
+
+    pool._members[1].governor.update('POST /2/tweets', limit=100, remaining=0, reset_at=2**40)
+    assert pool.acquire('POST /2/tweets') is first
+    assert pool.acquire('POST /2/tweets') is None
+    assert pool.delay('POST /2/tweets') > 0
+
+def test_rejected_credentials_leave_rotation_until_health_check_passes():
+    clock = FakeClock()
+    bad, good = MockClient(), MockClient()
+    pool = ClientPool(clock=clock, check_interval=60)
+    pool.add('bad', bad)
+    pool.add('good', good)
+
+    assert not pool.report_error(bad, tweepy.errors.TweepyException("timeout"))
+    assert pool.report_error(bad, unauthorized())
+    assert all(pool.acquire('GET /2/users/by') is good for _ in range(3))
+
+    bad.authorized = False
+    clock.now = 60
+    assert pool.check_health() == 0
+    clock.now = 120
+    bad.authorized = True
+    assert pool.check_health() == 1
+    assert [app["healthy"] for app in pool.stats()] == [True, True]
+
+def test_all_clients_out_of_rotation_waits_for_the_next_check():
+    clock = FakeClock()
+    client = MockClient()
+    pool = ClientPool(clock=clock, check_interval=60)
+    pool.add('only', client)
+    pool.report_error(client, unauthorized())
+    assert pool.acquire('POST /2/tweets') is None
+    assert pool.delay('POST /2/tweets') == 60
+
+def test_rate_limited_client_waits_while_others_carry_on():
+    limited, other = MockClient(), MockClient()
+    pool = ClientPool()
+    pool.add('limited', limited)
+    pool.add('other', other)
+    assert pool.report_rate_limited(limited, 'GET /2/users/:id/tweets', 900) == 0
+    assert all(pool.acquire('GET /2/users/:id/tweets') is other for _ in range(3))
+    assert 899 < pool.report_rate_limited(other, 'GET /2/users/:id/tweets', 900) <= 900
@@ -1,7 +1,7 @@
 import pytest
 import json
 import os
-from config_json import _validate_config, _add_account
+from config_json import ConfigStore, _validate_config, _add_account
 
 @pytest.fixture
 def valid_config():
@@ -35,4 +35,40 @@ def test_add_account(valid_config):
     assert account['username'] == "test_user"
     assert account['use_gpt'] == True
     assert account['custom_prompt'] == "Test prompt"
-    assert account['predefined_replies'] == ["reply1"] 
\ No newline at end of file
+    assert account['predefined_replies'] == ["reply1"] 
+
+def test_config_store_coalesces_saves(valid_config, tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(valid_config, path=path, save_delay=60)
+    store.save_soon()
+    valid_config['accounts_to_reply'].append({"username": "first", "use_gpt": True})
+    store.save_soon()
+    assert not os.path.exists(path)
+
+    store.flush()
+    with open(path) as f:
+        assert json.load(f)['accounts_to_reply'] == [{"username": "first", "use_gpt": True}]
+    assert not store.check_for_changes()
+
+def test_config_store_reloads_external_edits(valid_config, tmp_path):
+    path = str(tmp_path / "config.json")
+    valid_config['log_format'] = 'json'
+    store = ConfigStore(valid_config, path=path)
+    store.save()
+    reloaded = []
+    store.add_listener(reloaded.append)
+
+    edited = dict(valid_config, accounts_to_reply=[{"username": "edited", "use_gpt": False}])
+    del edited['log_format']
+    with open(path, 'w') as f:
+        json.dump(edited, f)
+        f.write(' ' * 10)  # Change the size too, mtime alone may not tick on coarse clocks
+    assert store.check_for_changes()
+    assert valid_config['accounts_to_reply'] == [{"username": "edited", "use_gpt": False}]
+    assert 'log_format' not in valid_config
+    assert reloaded == [valid_config]
+
+    with open(path, 'w') as f:
+        f.write("{not json")
+    assert not store.check_for_changes()
+    assert valid_config['accounts_to_reply'][0]['username'] == "edited"
@@ -0,0 +1,38 @@
+import logging
+from event_hub import EventHub, EventHubLogHandler, format_sse
+
+def test_publish_fans_out_to_all_subscribers():
+    hub = EventHub()
+    first, second = hub.subscribe(), hub.subscribe()
+    hub.publish('status', {'running': True})
+
+    assert first.get_nowait() == ('status', {'running': True})
+    assert second.get_nowait() == ('status', {'running': True})
+
+def test_slow_subscriber_drops_events():
+    hub = EventHub(queue_size=1)
+    subscriber = hub.subscribe()
+    hub.publish('log', 1)
+    hub.publish('log', 2)
+
+    assert subscriber.get_nowait() == ('log', 1)
+    assert hub.dropped == 1
+
+def test_unsubscribed_queue_gets_nothing():
+    hub = EventHub()
+    subscriber = hub.subscribe()
+    hub.unsubscribe(subscriber)
+    hub.publish('log', 1)
+
+    assert subscriber.empty()
+    assert hub.subscriber_count() == 0
+
+def test_log_handler_publishes_formatted_lines():
+    hub = EventHub()
+    subscriber = hub.subscribe()
+    logger = logging.getLogger('test_event_hub')
+    logger.addHandler(EventHubLogHandler(hub, {'test_event_hub': 'web'}))
+    logger.warning("hello")
+
+    assert subscriber.get_nowait() == ('log', {'source': 'web', 'line': 'hello'})
+    assert format_sse('log', {'line': 'hello'}) == 'event: log\ndata: {"line": "hello"}\n\n'
@@ -0,0 +1,55 @@
+import json
+import urllib.error
+import urllib.request
+import benchmark
+import gpt
+import x_api
+from fake_api import FakeOpenAIServer, FakeXServer
+
+def request(url, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, response.headers, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, json.load(e)
+
+def test_rate_limit_headers_and_429():
+    with FakeXServer(rate_limit=2, window=60) as server:
+        statuses = []
+        for _ in range(3):
+            status, headers, _ = request(f"{server.url}/2/users/by?usernames=someone")
+            statuses.append((status, headers['x-rate-limit-remaining']))
+    assert statuses == [(200, '1'), (200, '0'), (429, '0')]
+    assert server.rate_limited == 1 and server.calls == {'GET /2/users/by': 3}
+
+def test_timeline_pages_through_new_tweets():
+    with FakeXServer(tweets_per_poll=3) as server:
+        _, _, first = request(f"{server.url}/2/users/7/tweets?max_results=2")
+        _, _, second = request(f"{server.url}/2/users/7/tweets?max_results=2&pagination_token={first['meta']['next_token']}")
+    ids = [int(tweet['id']) for tweet in first['data'] + second['data']]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 3
+    assert 'next_token' not in second['meta']
+
+def test_openai_server_answers_completions():
+    with FakeOpenAIServer() as server:
+        status, _, body = request(f"{server.base_url}/chat/completions",
+                                  {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello"}]})
+    assert status == 200 and body['choices'][0]['message']['content']
+
+def test_benchmark_posts_every_reply(monkeypatch):
+    # benchmark.run swaps in fresh stores, put the test session's back afterwards
+    for name in ['reply_store', 'since_id_store', 'user_id_cache', 'scheduler', 'fetch_stage', 'generation_stage',
+                 'post_metrics', 'REPLY_WAIT_START', 'REPLY_WAIT_END']:
+        monkeypatch.setattr(x_api, name, getattr(x_api, name))
+    for name in ['response_cache', 'client', 'http_settings', 'base_url', 'api_key', 'connections']:
+        monkeypatch.setattr(gpt, name, getattr(gpt, name))
+
+    results = benchmark.run(accounts=3, tweets=2, cycles=2, use_gpt=True, apps=2, timeout=10)
+    assert results['replies'] == results['expected'] == 12
+    assert results['openai_calls'] == 12
+    assert all(text.startswith('@account') and 'Reply' in text for _, text in results['posted'])
+    assert len(results['latencies']) == 12
+    assert results['x_calls']['GET /2/users/by'] == 1  # IDs are cached after the first cycle
+    assert results['calls_per_reply'] == (1 + 3 * 2 + 12 + 12) / 12
@@ -0,0 +1,94 @@
+import pytest
+import openai
+import gpt
+from types import SimpleNamespace
+from response_cache import ResponseCache
+
+class MockCompletions:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.failures:
+            raise openai.APITimeoutError(request=None)
+        message = type('Message', (), {'content': 'Generated reply'})()
+        return type('Response', (), {'choices': [type('Choice', (), {'message': message})()]})()
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "gpt_cache.json"))
+    monkeypatch.setattr(gpt, 'response_cache', cache)
+    return cache
+
+@pytest.fixture
+def completions(monkeypatch, cache):
+    def install(failures):
+        mock = MockCompletions(failures)
+        monkeypatch.setattr(gpt, 'client', SimpleNamespace(chat=SimpleNamespace(completions=mock)))
+        monkeypatch.setattr(gpt.time, 'sleep', lambda seconds: None)
+        return mock
+    return install
+
+def test_transient_errors_are_retried(completions):
+    mock = completions(failures=2)
+    assert gpt.get_chatgpt_response("prompt") == 'Generated reply'
+    assert len(mock.calls) == 3
+    assert all(call['timeout'].read == gpt.REQUEST_TIMEOUT for call in mock.calls)
+    assert all(call['timeout'].connect == gpt.http_settings['connect_timeout'] for call in mock.calls)
+
+def test_gives_up_after_max_retries(completions):
+    mock = completions(failures=gpt.MAX_RETRIES + 1)
+    assert gpt.get_chatgpt_response("prompt") == gpt.FALLBACK_RESPONSE
+    assert len(mock.calls) == gpt.MAX_RETRIES + 1
+
+def test_cached_response_skips_request(completions, cache):
+    mock = completions(failures=0)
+    assert gpt.get_chatgpt_response("prompt") == 'Generated reply'
+    assert gpt.get_chatgpt_response("prompt") == 'Generated reply'
+    assert gpt.get_chatgpt_response("prompt", use_cache=False) == 'Generated reply'
+    assert len(mock.calls) == 2
+    assert cache.stats()['hits'] == 1
+
+def test_fallback_response_is_not_cached(completions, cache):
+    completions(failures=gpt.MAX_RETRIES + 1)
+    gpt.get_chatgpt_response("prompt")
+    assert cache.stats()['size'] == 0
+
+def test_cache_persists_and_evicts(tmp_path):
+    path = str(tmp_path / "gpt_cache.json")
+    cache = ResponseCache(path=path, max_size=2)
+    for prompt in ["one", "two", "three"]:
+        cache.put("model", prompt, prompt.upper())
+    cache.save()
+
+    reloaded = ResponseCache(path=path, max_size=2)
+    assert reloaded.get("model", "one") is None
+    assert reloaded.get("model", "three") == "THREE"
+    assert reloaded.get("other-model", "three") is None
+
+def test_near_duplicate_mode_matches_reposts(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "gpt_cache.json"), near_duplicate=True)
+    cache.put("model", "Reply to: Big news today! https://t.co/abc", "Wow")
+    assert cache.get("model", "Reply to: RT @someone: big news today https://t.co/xyz") == "Wow"
+    assert cache.stats() == {"hits": 1, "misses": 0, "hit_rate": 1.0, "size": 1}
+
+def test_real_client_gets_completion_from_fake_server(cache, monkeypatch):
+    from fake_api import FakeOpenAIServer
+    with FakeOpenAIServer() as server:
+        monkeypatch.setattr(gpt, 'client', None)
+        monkeypatch.setattr(gpt, 'api_key', 'test')
+        monkeypatch.setattr(gpt, 'base_url', server.base_url)
+        monkeypatch.setattr(gpt, 'connections', gpt.http_pool.ConnectionCounter())
+        assert gpt.get_chatgpt_response("first").startswith("Reply")
+        assert gpt.get_chatgpt_response("second").startswith("Reply")
+        assert server.calls == {'POST /v1/chat/completions': 2}
+    assert gpt.connections.stats() == {"requests": 2, "connections": 1, "reused": 1}
+
+def test_client_setup_failure_returns_fallback(cache, monkeypatch):
+    def broken_client():
+        raise ModuleNotFoundError("No module named 'httpx'")
+    monkeypatch.setattr(gpt, 'client', None)
+    monkeypatch.setattr(gpt, '_create_client', broken_client)
+    assert gpt.get_chatgpt_response("prompt") == gpt.FALLBACK_RESPONSE
@@ -0,0 +1,49 @@
+import pytest
+import requests
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import http_pool
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_settings_fill_in_defaults():
+    settings = http_pool.settings({'http': {'pool_size': 4}})
+    assert settings == {"pool_size": 4, "connect_timeout": http_pool.CONNECT_TIMEOUT,
+                        "read_timeout": http_pool.READ_TIMEOUT, "http2": False}
+
+def test_session_reuses_connections_and_applies_timeout(server_url, monkeypatch):
+    session = requests.Session()
+    adapter = http_pool.configure_session(session, pool_size=2, connect_timeout=1, read_timeout=2)
+    timeouts = []
+    send = requests.adapters.HTTPAdapter.send
+    def recording_send(self, request, **kwargs):
+        timeouts.append(kwargs['timeout'])
+        return send(self, request, **kwargs)
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', recording_send)
+
+    for _ in range(3):
+        assert session.get(server_url).text == 'ok'
+    assert session.get(server_url, timeout=9).ok
+
+    assert session.get_adapter(server_url) is adapter
+    assert timeouts == [(1, 2)] * 3 + [9]
+    assert http_pool.session_stats(session) == {"requests": 4, "connections": 1, "reused": 3}
@@ -0,0 +1,72 @@
+import io
+import json
+import logging
+import queue
+from log import BatchedFileHandler, BatchedStreamHandler, LogQueueHandler, LogWriter
+from log_format import JsonLinesFormatter, text_formatter
+
+def make_logger(name, log_queue):
+    logger = logging.getLogger(name)
+    logger.handlers = [LogQueueHandler(log_queue, name)]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+def test_writer_routes_records_to_their_file(tmp_path):
+    log_queue = queue.Queue()
+    console = io.StringIO()
+    writer = LogWriter(log_queue, BatchedStreamHandler(console))
+    first_file = BatchedFileHandler(str(tmp_path / "first.log"))
+    writer.add_route('test_first', first_file)
+    writer.add_route('test_second', BatchedFileHandler(str(tmp_path / "second.log")))
+    writer.start()
+
+    make_logger('test_first', log_queue).info("to first")
+    make_logger('test_second', log_queue).info("to second")
+    writer.stop()
+    first_file.close()
+
+    assert (tmp_path / "first.log").read_text() == "to first\n"
+    assert (tmp_path / "second.log").read_text() == "to second\n"
+    assert console.getvalue() == "to first\nto second\n"
+
+def test_full_queue_drops_info_and_reports_it():
+    log_queue = queue.Queue(maxsize=2)
+    logger = make_logger('test_drop', log_queue)
+    for message in ["kept", "also kept", "dropped"]:
+        logger.info(message)
+    assert logger.handlers[0].dropped == 1
+
+    log_queue.get_nowait()
+    log_queue.get_nowait()
+    logger.info("after")
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == ["after", "Dropped 1 log record(s), log queue was full"]
+    assert logger.handlers[0].dropped == 0
+
+def test_queued_exception_reaches_the_json_format():
+    log_queue = queue.Queue()
+    logger = make_logger('test_exception', log_queue)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    record = log_queue.get_nowait()
+
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry["message"] == "failed"
+    assert entry["exception"].startswith("Traceback") and "ValueError: boom" in entry["exception"]
+    assert text_formatter().format(record).count("ValueError: boom") == 1
+
+def test_synchronous_console_writes_before_the_writer_runs(monkeypatch):
+    import log
+    log_queue = queue.Queue()
+    console = io.StringIO()
+    console_handler = BatchedStreamHandler(console)
+    writer = LogWriter(log_queue, console_handler)
+    monkeypatch.setattr(log, 'synchronous_console', console_handler)
+
+    make_logger('test_sync', log_queue).warning("before the prompt")
+    assert console.getvalue() == "before the prompt\n"
+    writer.start()
+    writer.stop()
+    assert console.getvalue() == "before the prompt\n"  # Not written again by the writer thread
@@ -0,0 +1,28 @@
+import json
+import logging
+from datetime import datetime
+from log_format import JsonLinesFormatter, has_level, line_timestamp, parse_line, to_text_line
+
+def make_record(message, level=logging.INFO, **fields):
+    record = logging.LogRecord('twitta_api', level, __file__, 0, message, None, None)
+    record.created = datetime(2024, 1, 1, 10, 0).timestamp()
+    record.__dict__.update(fields)
+    return record
+
+def test_json_line_carries_structured_fields():
+    line = JsonLinesFormatter().format(make_record("Posted", event='post', account='someone', tweet_id=42, latency_ms=12.5))
+    assert line.startswith('{"time": "2024-01-01 10:00:00"')
+    assert json.loads(line) == {"time": "2024-01-01 10:00:00", "logger": "twitta_api", "level": "INFO", "message": "Posted",
+                                "event": "post", "account": "someone", "tweet_id": 42, "latency_ms": 12.5}
+
+def test_json_and_text_lines_read_the_same():
+    json_line = JsonLinesFormatter().format(make_record("failed", level=logging.ERROR, event='post_error'))
+    text_line = "2024-01-01 10:00:00 - twitta_api - ERROR - failed"
+
+    assert line_timestamp(json_line) == line_timestamp(text_line) == "2024-01-01 10:00:00"
+    assert has_level(json_line, 'ERROR') and has_level(text_line, 'ERROR')
+    assert not has_level(json_line, 'INFO')
+    assert to_text_line(json_line) == text_line
+    assert parse_line(text_line) == {"time": "2024-01-01 10:00:00", "logger": "twitta_api", "level": "ERROR", "message": "failed"}
+    assert parse_line("Traceback line") == {"message": "Traceback line"}
+    assert line_timestamp("Traceback line") is None
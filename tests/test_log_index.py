@@ -0,0 +1,90 @@
+import logging
+import os
+import pytest
+from datetime import datetime
+from log_format import LOG_DATE_FORMAT, LOG_FORMAT
+from log_index import IndexedFileHandler, LogIndex, RotatingIndexedFileHandler, index_path, log_segments, read_log_range
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "test.log")
+
+def write_records(log_path, entries, checkpoint_interval=1):
+    handler = IndexedFileHandler(log_path, checkpoint_interval=checkpoint_interval)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    for created, level, message in entries:
+        record = logging.LogRecord('test', level, __file__, 0, message, None, None)
+        record.created = created.timestamp()
+        handler.emit(record)
+    handler.close()
+
+def test_handler_writes_checkpoints(log_path):
+    write_records(log_path, [(datetime(2024, 1, 1, 10, minute), logging.INFO, f"m{minute}") for minute in range(5)])
+    with open(log_path + '.idx') as f:
+        checkpoints = [line.split() for line in f]
+    assert len(checkpoints) == 5
+    assert checkpoints[0][1] == '0'
+
+def test_read_time_range_and_level(log_path):
+    write_records(log_path, [
+        (datetime(2024, 1, 1, 10, 0), logging.INFO, "before"),
+        (datetime(2024, 1, 1, 10, 5), logging.ERROR, "failed\nTraceback line"),
+        (datetime(2024, 1, 1, 10, 6), logging.INFO, "inside"),
+        (datetime(2024, 1, 1, 10, 9), logging.INFO, "after"),
+    ])
+    index = LogIndex(log_path)
+
+    lines, truncated = index.read(start=datetime(2024, 1, 1, 10, 1), end=datetime(2024, 1, 1, 10, 7))
+    assert [line.split(' - ')[-1] for line in lines] == ["failed", "Traceback line", "inside"]
+    assert not truncated
+
+    lines, _ = index.read(start=datetime(2024, 1, 1, 10, 1), level='error')
+    assert len(lines) == 2 and lines[0].endswith("failed")
+
+    lines, truncated = index.read(limit=2)
+    assert len(lines) == 2 and truncated
+
+def test_seek_skips_to_checkpoint_before_start(log_path):
+    write_records(log_path, [(datetime(2024, 1, 1, 10, minute), logging.INFO, "x" * 50) for minute in range(10)])
+    index = LogIndex(log_path)
+
+    assert index.seek_offset(datetime(2024, 1, 1, 9, 0)) == 0
+    offset = index.seek_offset(datetime(2024, 1, 1, 10, 5))
+    with open(log_path, 'rb') as f:
+        f.seek(offset)
+        assert f.readline().startswith(b'2024-01-01 10:04:00')
+
+def write_rotating(log_path, entries, **kwargs):
+    handler = RotatingIndexedFileHandler(log_path, checkpoint_interval=1, **kwargs)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    for created, message in entries:
+        record = logging.LogRecord('test', logging.INFO, __file__, 0, message, None, None)
+        record.created = created.timestamp()
+        handler.emit(record)
+    handler.close()
+
+def test_rotates_by_day_into_readable_archives(log_path):
+    write_rotating(log_path, [
+        (datetime(2024, 1, 1, 23, 0), "day one"),
+        (datetime(2024, 1, 2, 1, 0), "day two"),
+    ])
+    segments = log_segments(log_path)
+    assert len(segments) == 2 and segments[0].endswith('.gz')
+    assert os.path.exists(index_path(segments[0]))
+    with open(log_path) as f:
+        assert f.read().endswith("day two\n")
+
+    lines, _ = read_log_range(log_path, start=datetime(2024, 1, 1), end=datetime(2024, 1, 3))
+    assert [line.split(' - ')[-1] for line in lines] == ["day one", "day two"]
+
+def test_rotates_by_size_and_prunes_old_archives(log_path):
+    write_rotating(log_path, [(datetime.now(), "x" * 100) for _ in range(3)], max_bytes=50, retention_days=1)
+    archives = log_segments(log_path)[:-1]
+    assert len(archives) == 2
+
+    old = datetime.now().timestamp() - 2 * 24 * 60 * 60
+    os.utime(archives[0], (old, old))
+    write_rotating(log_path, [(datetime.now(), "y" * 100)], max_bytes=50, retention_days=1)
+    remaining = log_segments(log_path)[:-1]
+    assert archives[0] not in remaining and archives[1] in remaining
+    assert not os.path.exists(index_path(archives[0]))
@@ -0,0 +1,34 @@
+import pytest
+from metrics import Counter, Histogram, Registry
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('request_seconds', "Latency", ['call'], buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 2.0):
+        histogram.observe(seconds, call='get')
+    assert histogram.render().splitlines() == [
+        '# HELP request_seconds Latency',
+        '# TYPE request_seconds histogram',
+        'request_seconds_bucket{call="get",le="0.1"} 1',
+        'request_seconds_bucket{call="get",le="1.0"} 3',
+        'request_seconds_bucket{call="get",le="+Inf"} 4',
+        'request_seconds_sum{call="get"} 3.05',
+        'request_seconds_count{call="get"} 4'
+    ]
+
+def test_counter_labels_are_escaped_and_checked():
+    counter = Counter('tweets_total', "Tweets", ['account', 'outcome'])
+    counter.inc(2, account='say "hi"', outcome='fetched')
+    assert 'tweets_total{account="say \\"hi\\"",outcome="fetched"} 2' in counter.render()
+    with pytest.raises(ValueError):
+        counter.inc(account='someone')
+
+def test_timer_observes_failures_and_registry_rejects_duplicates():
+    registry = Registry()
+    histogram = registry.register(Histogram('call_seconds', "Latency"))
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError("failed")
+    assert histogram.count() == 1
+    with pytest.raises(ValueError):
+        registry.register(Histogram('call_seconds', "Latency"))
+    assert registry.render().startswith('# HELP call_seconds Latency')
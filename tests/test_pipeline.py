@@ -0,0 +1,55 @@
+import threading
+import time
+from pipeline import Stage, StageMetrics, chain
+
+def test_map_yields_results_in_submission_order():
+    def slow_square(n):
+        time.sleep(0.01 * (5 - n))  # Later items finish first
+        return n * n
+    stage = Stage('square', slow_square, 4, 8)
+    assert list(stage.map(((n,) for n in range(5)), window=3)) == [0, 1, 4, 9, 16]
+    stats = stage.stats()
+    assert stats["processed"] == 5 and stats["in_flight"] == 0
+    stage.close()
+
+def test_full_queue_blocks_the_submitter():
+    release = threading.Event()
+    stage = Stage('blocked', lambda: release.wait(5), 1, 1)
+    stage.submit()  # Taken by the worker
+    while stage.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    stage.submit()  # Fills the queue
+    submitted = threading.Event()
+    thread = threading.Thread(target=lambda: (stage.submit(), submitted.set()))
+    thread.start()
+    assert not submitted.wait(0.1)
+    assert stage.stats()["queue_depth"] == 1
+    release.set()
+    assert submitted.wait(5)
+    thread.join()
+    stage.close()
+
+def test_chain_passes_the_result_on_and_keeps_errors():
+    double = Stage('double', lambda n: n * 2, 1, 4)
+    label = Stage('label', lambda prefix, n: f"{prefix}{n}", 1, 4)
+    assert chain(double.submit(21), label, "answer ").result(5) == "answer 42"
+
+    def fail(n):
+        raise ValueError("bad input")
+    failing = Stage('fail', fail, 1, 4)
+    chained = chain(failing.submit(1), label, "never ")
+    assert isinstance(chained.exception(5), ValueError)
+    assert failing.stats()["errors"] == 1
+    for stage in (double, label, failing):
+        stage.close()
+
+def test_metrics_forget_work_outside_the_window():
+    now = [0.0]
+    metrics = StageMetrics(window=60, clock=lambda: now[0])
+    metrics.record(30)
+    metrics.record(30, failed=True)
+    stats = metrics.stats(workers=2, queue_depth=3)
+    assert stats["per_minute"] == 2 and stats["utilization"] == 0.5 and stats["errors"] == 1
+    now[0] = 61
+    stats = metrics.stats(workers=2, queue_depth=0)
+    assert stats["per_minute"] == 0 and stats["avg_ms"] is None and stats["processed"] == 2
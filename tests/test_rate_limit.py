@@ -0,0 +1,48 @@
+import pytest
+from rate_limit import RateLimitGovernor, endpoint_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def governor(clock):
+    return RateLimitGovernor(clock=clock)
+
+def test_endpoint_key_normalizes_ids():
+    assert endpoint_key('get', 'https://api.twitter.com/2/users/12345/tweets?max_results=5') == 'GET /2/users/:id/tweets'
+    assert endpoint_key('POST', 'https://api.twitter.com/2/tweets') == 'POST /2/tweets'
+
+def test_unknown_endpoint_is_not_limited(governor):
+    assert governor.try_acquire('GET /2/users/by')
+    assert governor.delay('GET /2/users/by') == 0
+
+def test_spent_quota_waits_for_reset(governor, clock):
+    governor.update('POST /2/tweets', limit=100, remaining=1, reset_at=1300)
+    assert governor.try_acquire('POST /2/tweets')
+    assert not governor.try_acquire('POST /2/tweets')
+    assert governor.delay('POST /2/tweets') == 300
+
+    clock.now = 1300
+    assert governor.remaining('POST /2/tweets') == 100
+    assert governor.try_acquire('POST /2/tweets')
+
+def test_response_headers_update_bucket(governor):
+    class Request:
+        method = 'GET'
+        url = 'https://api.twitter.com/2/users/42/tweets'
+
+    class Response:
+        request = Request()
+        headers = {'x-rate-limit-limit': '1500', 'x-rate-limit-remaining': '0', 'x-rate-limit-reset': '1900'}
+
+    governor._on_response(Response())
+    assert governor.remaining('GET /2/users/:id/tweets') == 0
+    assert governor.delay('GET /2/users/:id/tweets') == 900
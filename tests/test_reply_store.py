@@ -0,0 +1,49 @@
+import pytest
+import time
+from reply_store import MemoryReplyStore, SqliteReplyStore
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "replies.db")
+
+def test_sqlite_store_survives_restart(db_path):
+    store = SqliteReplyStore(path=db_path)
+    store.add(1)
+    store.add(2)
+    store.add(2)
+    store.close()
+
+    reopened = SqliteReplyStore(path=db_path)
+    assert 1 in reopened
+    assert 3 not in reopened
+    assert reopened.count() == 2
+
+def test_sqlite_store_buffers_writes(db_path):
+    store = SqliteReplyStore(path=db_path)
+    store.add(1)
+    assert 1 in store  # Visible before the batch is committed
+    assert SqliteReplyStore(path=db_path).count() == 0
+
+    store.flush()
+    assert SqliteReplyStore(path=db_path).count() == 1
+
+def test_sqlite_store_prunes_old_replies(db_path):
+    store = SqliteReplyStore(path=db_path, retention=60)
+    store.add(1)
+    store.add(2)
+    store.flush()
+    store._connect().execute("UPDATE replied_tweets SET replied_at = ? WHERE tweet_id = 1", (time.time() - 120,))
+    store.prune()
+
+    assert 1 not in store  # Evicted from the cache as well
+    assert 2 in store
+    assert store.count() == 1
+
+def test_memory_store_is_bounded():
+    store = MemoryReplyStore(max_size=2)
+    for tweet_id in [1, 2, 3]:
+        store.add(tweet_id)
+
+    assert 1 not in store
+    assert 3 in store
+    assert store.count() == 2
@@ -0,0 +1,69 @@
+import pytest
+import threading
+import time
+from scheduler import Scheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def scheduler(clock):
+    return Scheduler(clock=clock, sleep=clock.sleep)
+
+def test_deferred_key_does_not_block_other_keys(scheduler, clock):
+    ran = []
+    scheduler.defer(('fetch', 'slow'), 60)
+    scheduler.call_when_ready(('fetch', 'slow'), ran.append, 'slow')
+    scheduler.call_when_ready(('fetch', 'fast'), ran.append, 'fast')
+
+    assert scheduler.run_pending() == 1
+    assert ran == ['fast']
+    assert not scheduler.is_ready(('fetch', 'slow'))
+
+    clock.now = 60
+    scheduler.run_pending()
+    assert ran == ['fast', 'slow']
+
+def test_defer_after_queueing_holds_tasks_in_order(scheduler, clock):
+    ran = []
+
+    def post(name):
+        ran.append((name, clock.now))
+        scheduler.defer(('post',), 100)
+
+    for name in ['first', 'second', 'third']:
+        scheduler.call_when_ready(('post',), post, name)
+
+    scheduler.run_for(250)
+    assert ran == [('first', 0), ('second', 100), ('third', 200)]
+    assert scheduler.pending() == 0
+
+def test_failing_task_does_not_stop_scheduler(scheduler):
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler.call_when_ready(('post',), fail)
+    scheduler.call_when_ready(('post',), ran.append, 'after')
+    assert scheduler.run_pending() == 2
+    assert ran == ['after']
+
+def test_run_for_returns_when_woken():
+    scheduler = Scheduler()
+    wake = threading.Event()
+    threading.Timer(0.05, wake.set).start()
+    started = time.monotonic()
+    scheduler.run_for(30, wake=wake)
+    assert time.monotonic() - started < 5
@@ -0,0 +1,21 @@
+import pytest
+from since_ids import SinceIdStore
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "since_ids.json")
+
+def test_since_id_persists_between_instances(store_path):
+    store = SinceIdStore(path=store_path)
+    store.advance(7, 200)
+    store.save()
+
+    assert SinceIdStore(path=store_path).get(7) == 200
+    assert SinceIdStore(path=store_path).get(8) is None
+
+def test_since_id_only_moves_forward(store_path):
+    store = SinceIdStore(path=store_path)
+    store.advance(7, 200)
+    store.advance(7, 150)
+
+    assert store.get(7) == 200
@@ -0,0 +1,27 @@
+import pytest
+from user_cache import UserIdCache
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "user_ids.json")
+
+def test_cache_persists_between_instances(cache_path):
+    cache = UserIdCache(path=cache_path)
+    cache.update({'Test_User': 42})
+    cache.save()
+
+    assert UserIdCache(path=cache_path).get('test_user') == 42
+
+def test_cache_entries_expire(cache_path):
+    cache = UserIdCache(path=cache_path, ttl=0)
+    cache.update({'test_user': 42})
+    assert cache.get('test_user') is None
+
+def test_cache_invalidate(cache_path):
+    cache = UserIdCache(path=cache_path)
+    cache.update({'test_user': 42})
+    cache.save()
+    cache.invalidate('test_user')
+    cache.save()
+
+    assert UserIdCache(path=cache_path).get('test_user') is None
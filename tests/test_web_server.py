@@ -1,7 +1,9 @@
 import pytest
 from flask import url_for
+from client_pool import ClientPool
 from web_server import TwitterBotServer, User
 import json
+import os
 
 @pytest.fixture
 def test_config():
@@ -29,7 +31,7 @@ def test_config():
 
 @pytest.fixture
 def app(test_config):
-    server = TwitterBotServer(test_config, None)
+    server = TwitterBotServer(test_config, ClientPool())
     return server.app
 
 @pytest.fixture
@@ -70,4 +72,152 @@ def test_rate_limiting(client):
             'username': 'wrong',
             'password': 'wrong'
         })
-    assert response.status_code == 429 
\ No newline at end of file
+    assert response.status_code == 429 
+
+@pytest.fixture
+def logged_in_client(app, client, monkeypatch):
+    import x_api
+    from reply_store import MemoryReplyStore
+    monkeypatch.setattr(x_api, 'reply_store', MemoryReplyStore())
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin'
+        session['_fresh'] = True
+    return client
+
+def test_logs_since_offset_returns_only_new_lines(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write("first line\n")
+    initial = logged_in_client.get('/api/logs?source=api').get_json()
+    assert initial['logs'][-1] == "first line"
+
+    with open('logs/api.log', 'a') as f:
+        f.write("second line\nthird line\npartial")
+    delta = logged_in_client.get(f"/api/logs?source=api&since={initial['offset']}").get_json()
+    assert delta['logs'] == ["second line", "third line"]
+    assert delta['reset'] is False
+
+    unchanged = logged_in_client.get(f"/api/logs?source=api&since={delta['offset']}").get_json()
+    assert unchanged['logs'] == []
+    assert unchanged['offset'] == delta['offset']
+
+def test_logs_since_past_end_resets(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write("line\n")
+    response = logged_in_client.get('/api/logs?source=api&since=999999999').get_json()
+    assert response['reset'] is True
+    assert response['logs'][-1] == "line"
+
+def test_stream_pushes_status_and_logs(app, logged_in_client):
+    response = logged_in_client.get('/api/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = (chunk.decode() for chunk in response.response)
+    assert next(chunks).startswith('event: status\n')
+
+    import log
+    log.api_logger.handlers = [log.LogQueueHandler(log.log_queue, 'twitta_api')]  # conftest strips handlers between tests
+    log.api_logger.info("streamed line")
+    event = next(chunks)
+    assert event.startswith('event: log\n')
+    assert '"source": "api"' in event and 'streamed line' in event
+    response.close()
+
+def test_state_change_publishes_only_the_state(test_config, monkeypatch):
+    import x_api
+    server = TwitterBotServer(test_config, ClientPool())
+    monkeypatch.setattr(x_api, 'pipeline_stats', lambda: pytest.fail("stats built on the bot thread"))
+    subscriber = server.events.subscribe()
+    server.state.update(status_message="Fetching")
+    event, data = subscriber.get_nowait()
+    assert event == 'status' and data['status_message'] == "Fetching" and 'pipeline' not in data
+    server.state.remove_listener(server._on_state_change)
+
+def test_logs_query_by_time_and_level(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write("2024-01-01 10:00:00 - twitta_api - INFO - early\n")
+        f.write("2024-01-01 10:05:00 - twitta_api - ERROR - broken\n")
+        f.write("2024-01-01 10:06:00 - twitta_api - INFO - fine\n")
+    response = logged_in_client.get('/api/logs?source=api&from=2024-01-01T10:01:00&to=2024-01-01T10:10:00&level=ERROR')
+    assert response.get_json() == {"logs": ["2024-01-01 10:05:00 - twitta_api - ERROR - broken"], "truncated": False}
+
+    response = logged_in_client.get('/api/logs?source=api&from=yesterday')
+    assert response.status_code == 400
+
+def test_logs_since_offset_resets_after_rotation(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write("old file line\n")
+    initial = logged_in_client.get('/api/logs?source=api').get_json()
+
+    os.replace('logs/api.log', 'logs/api.log.rotated')
+    with open('logs/api.log', 'a') as f:
+        f.write("new file line that is longer\n")
+    response = logged_in_client.get(f"/api/logs?source=api&since={initial['offset']}&file_id={initial['file_id']}").get_json()
+    os.remove('logs/api.log.rotated')
+
+    assert response['reset'] is True
+    assert response['logs'] == ["new file line that is longer"]
+
+def test_logs_query_filters_json_entries_by_field(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write('{"time": "2024-01-01 10:00:00", "logger": "twitta_api", "level": "INFO", "message": "Posted", "event": "post", "account": "first", "tweet_id": 1}\n')
+        f.write('{"time": "2024-01-01 10:01:00", "logger": "twitta_api", "level": "INFO", "message": "Posted", "event": "post", "account": "second", "tweet_id": 2}\n')
+        f.write('{"time": "2024-01-01 10:02:00", "logger": "twitta_api", "level": "INFO", "message": "Fetched", "event": "fetch", "account": "second"}\n')
+    response = logged_in_client.get('/api/logs/query?source=api&event=post&account=second').get_json()
+    assert response['truncated'] is False
+    assert [entry['tweet_id'] for entry in response['entries']] == [2]
+
+    tail = logged_in_client.get('/api/logs?source=api').get_json()
+    assert tail['logs'][-1] == "2024-01-01 10:02:00 - twitta_api - INFO - Fetched"
+
+def test_large_responses_are_gzipped(logged_in_client):
+    with open('logs/api.log', 'a') as f:
+        f.write("a log line that repeats\n" * 100)
+    plain = logged_in_client.get('/api/logs?source=api')
+    assert 'Content-Encoding' not in plain.headers
+
+    compressed = logged_in_client.get('/api/logs?source=api', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    import gzip
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+@pytest.fixture
+def config_path(monkeypatch, tmp_path):
+    path = tmp_path / "config.json"
+    monkeypatch.setenv('CONFIG_PATH', str(path))
+    return path
+
+def test_accounts_are_paginated_searchable_and_cached(config_path, logged_in_client):
+    for username in ["alice", "bob", "alfred"]:
+        response = logged_in_client.post('/api/accounts', json={'username': username, 'use_gpt': False})
+        assert response.get_json()['status'] == 'success'
+
+    page = logged_in_client.get('/api/accounts?offset=1&limit=1')
+    assert page.get_json()['accounts'][0]['username'] == "bob"
+    assert page.get_json()['total'] == 3
+    search = logged_in_client.get('/api/accounts?q=AL').get_json()
+    assert [account['username'] for account in search['accounts']] == ["alice", "alfred"]
+
+    etag = page.headers['ETag']
+    assert logged_in_client.get('/api/accounts', headers={'If-None-Match': etag}).status_code == 304
+    logged_in_client.delete('/api/accounts', json={'username': 'bob'})
+    assert logged_in_client.get('/api/accounts', headers={'If-None-Match': etag}).status_code == 200
+
+    assert logged_in_client.get('/api/accounts/Alice').get_json()['username'] == "alice"
+    assert logged_in_client.get('/api/accounts/bob').status_code == 404
+
+def test_metrics_require_login_or_token(app, client, logged_in_client, test_config):
+    import metrics
+    import x_api
+    x_api.tweet_counter.inc(account='metrics_test', outcome='fetched')
+
+    response = logged_in_client.get('/metrics')
+    assert response.status_code == 200 and response.headers['Content-Type'] == metrics.CONTENT_TYPE
+    text = response.get_data(as_text=True)
+    assert 'twitta_tweets_total{account="metrics_test",outcome="fetched"}' in text
+    assert '# TYPE twitta_web_request_seconds histogram' in text
+    assert 'twitta_bot_running 0' in text
+
+    logged_in_client.get('/logout')
+    assert client.get('/metrics').status_code == 401
+    test_config['web_interface']['metrics_token'] = 'scrape-secret'
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
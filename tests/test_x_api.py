@@ -1,8 +1,49 @@
 import pytest
+from client_pool import ClientPool
 from x_api import _handle_reply, _increment_request_count
 from datetime import datetime
+import time
+import requests
 import tweepy
 
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class MockTweet:
+    def __init__(self, tweet_id):
+        self.id = tweet_id
+        self.text = f"tweet {tweet_id}"
+
+def pool_of(*clients, clock=time.time):
+    pool = ClientPool(clock=clock)
+    for i, client in enumerate(clients):
+        client.session = requests.Session()
+        pool.add(f'app{i}', client)
+    return pool
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Fresh reply, since_id and user ID stores and a scheduler on a fake clock, returns the clock"""
+    import x_api
+    from reply_store import MemoryReplyStore
+    from scheduler import Scheduler
+    from since_ids import SinceIdStore
+    from user_cache import UserIdCache
+
+    clock = FakeClock()
+    monkeypatch.setattr(x_api, 'reply_store', MemoryReplyStore())
+    monkeypatch.setattr(x_api, 'since_id_store', SinceIdStore(path=str(tmp_path / "since_ids.json")))
+    monkeypatch.setattr(x_api, 'user_id_cache', UserIdCache(path=str(tmp_path / "user_ids.json")))
+    monkeypatch.setattr(x_api, 'scheduler', Scheduler(clock=clock))
+    monkeypatch.setattr(x_api, 'queued_tweet_ids', set())
+    monkeypatch.setattr(x_api, 'fetched_tweets', {})
+    monkeypatch.setattr(x_api, 'timeline_cursors', {})
+    return clock
+
 @pytest.fixture
 def mock_tweet():
     class MockTweet:
@@ -39,4 +80,189 @@ def test_rate_limiting():
     
     assert user_id in user_request_counts
     assert user_request_counts[user_id]['count'] == 1
-    assert isinstance(user_request_counts[user_id]['first_request_time'], datetime) 
\ No newline at end of file
+    assert isinstance(user_request_counts[user_id]['first_request_time'], datetime) 
+
+def test_fetch_accounts_runs_concurrently_in_order():
+    import threading
+    import x_api
+
+    barrier = threading.Barrier(3, timeout=5)
+
+    class MockResponse:
+        def __init__(self, data):
+            self.data = data
+            self.meta = {}
+
+    class MockClient:
+        def get_users_tweets(self, user_id, **kwargs):
+            barrier.wait()  # Fails unless all three fetches are in flight at once
+            return MockResponse([user_id + "_tweet"])
+
+    accounts = [{'username': name} for name in ['a', 'b', 'c']]
+    user_ids = {name: name + "_id" for name in ['a', 'b', 'c']}
+    results = list(x_api._fetch_accounts(pool_of(MockClient()), accounts, user_ids, 3))
+
+    assert [account['username'] for account, _, _, _ in results] == ['a', 'b', 'c']
+    assert [tweets for _, _, tweets, _ in results] == [['a_id_tweet'], ['b_id_tweet'], ['c_id_tweet']]
+
+def test_resolve_user_ids_batches_cache_misses(tmp_path, monkeypatch):
+    import x_api
+    from user_cache import UserIdCache
+
+    cache = UserIdCache(path=str(tmp_path / "user_ids.json"))
+    cache.update({'cached': 1})
+    monkeypatch.setattr(x_api, 'user_id_cache', cache)
+
+    class MockUser:
+        def __init__(self, username, user_id):
+            self.username = username
+            self.id = user_id
+
+    class MockClient:
+        def __init__(self):
+            self.lookups = []
+
+        def get_users(self, usernames):
+            self.lookups.append(usernames)
+            class Response:
+                data = [MockUser(name.upper(), index + 2) for index, name in enumerate(usernames) if name != 'missing']
+            return Response()
+
+    client = MockClient()
+    user_ids = x_api._resolve_user_ids(pool_of(client), ['cached', 'new', 'missing'])
+
+    assert client.lookups == [['new', 'missing']]
+    assert user_ids == {'cached': 1, 'new': 2}
+    assert UserIdCache(path=str(tmp_path / "user_ids.json")).get('NEW') == 2
+
+def test_fetch_new_tweets_pages_from_since_id(stores):
+    import x_api
+    x_api.since_id_store.advance(7, 100)
+
+    class MockResponse:
+        def __init__(self, data, next_token):
+            self.data = data
+            self.meta = {'next_token': next_token} if next_token else {}
+
+    class MockClient:
+        def __init__(self):
+            self.calls = []
+
+        def get_users_tweets(self, user_id, **kwargs):
+            self.calls.append(kwargs)
+            if kwargs['pagination_token'] is None:
+                return MockResponse([MockTweet(103), MockTweet(102)], 'page2')
+            return MockResponse([MockTweet(101)], None)
+
+    client = MockClient()
+    tweets, cursor = x_api._fetch_new_tweets(pool_of(client), client, 7)
+
+    assert [tweet.id for tweet in tweets] == [103, 102, 101] and cursor is None
+    assert all(call['since_id'] == 100 and 'start_time' not in call for call in client.calls)
+    assert [call['pagination_token'] for call in client.calls] == [None, 'page2']
+
+    # Each further page takes its own quota, without any the rest is left for the next fetch
+    pool = pool_of(client)
+    pool._members[0].governor.update(x_api.TIMELINE_ENDPOINT, limit=100, remaining=0, reset_at=2**40)
+    tweets, cursor = x_api._fetch_new_tweets(pool, client, 7)
+    assert [tweet.id for tweet in tweets] == [103, 102] and cursor == 'page2'
+
+    x_api.timeline_cursors[7] = cursor
+    tweets, cursor = x_api._fetch_new_tweets(pool_of(client), client, 7)
+    assert [tweet.id for tweet in tweets] == [101] and cursor is None
+
+def test_rate_limited_post_is_retried_after_backoff(stores):
+    import x_api
+    clock = stores
+
+    class MockClient:
+        def __init__(self):
+            self.posts = 0
+
+        def create_tweet(self, **kwargs):
+            self.posts += 1
+            if self.posts == 1:
+                response = type('Response', (), {'status_code': 429, 'reason': 'Too Many Requests', 'json': lambda self: {}})()
+                raise tweepy.errors.TooManyRequests(response)
+
+    client = MockClient()
+    x_api.scheduler.call_when_ready(x_api.POST_ACTION, x_api._post_reply, pool_of(client, clock=clock), 'test_user', 1, 'hi')
+    x_api.scheduler.run_pending()
+    assert client.posts == 1 and 1 not in x_api.reply_store
+
+    clock.now = x_api.RATE_LIMIT_WAIT
+    x_api.scheduler.run_pending()
+    assert client.posts == 2 and 1 in x_api.reply_store
+    assert not x_api.scheduler.is_ready(x_api.POST_ACTION)  # Paced before the next post
+
+def test_reply_to_tweets_generates_replies_concurrently(stores, monkeypatch):
+    import threading
+    import x_api
+    clock = stores
+    x_api.user_id_cache.update({'test_user': 7})
+
+    barrier = threading.Barrier(3, timeout=5)
+    def mock_gpt_response(prompt, *args):
+        barrier.wait()  # Fails unless all three completions are in flight at once
+        return "Reply to " + prompt
+    monkeypatch.setattr('gpt.get_chatgpt_response', mock_gpt_response)
+
+    class MockClient:
+        def __init__(self):
+            self.posted = []
+
+        def get_users_tweets(self, user_id, **kwargs):
+            return type('Response', (), {'data': [MockTweet(3), MockTweet(2), MockTweet(1)], 'meta': {}})()
+
+        def create_tweet(self, text, **kwargs):
+            self.posted.append(text)
+
+    client = MockClient()
+    account = {'username': 'test_user', 'use_gpt': True, 'custom_prompt': '{tweet_text}', 'predefined_replies': []}
+    x_api.reply_to_tweets(pool_of(client), {'accounts_to_reply': [account]}, True)
+
+    assert client.posted == ["@test_user Reply to tweet 3"]  # Remaining replies wait for their post slot
+    assert x_api.scheduler.pending() == 2
+    assert x_api.since_id_store.get(7) is None  # Older tweets 2 and 1 would be lost on a restart
+
+    for _ in range(2):
+        clock.now += x_api.REPLY_WAIT_END
+        x_api.scheduler.run_pending()
+    assert len(client.posted) == 3
+    assert x_api.since_id_store.get(7) == 3
+
+def test_reply_to_tweets_holds_back_tweets_over_the_queue_limit(stores):
+    import x_api
+    clock = stores
+    x_api.user_id_cache.update({'test_user': 7})
+
+    class MockClient:
+        def __init__(self):
+            self.posted = []
+            self.since_ids = []
+
+        def get_users_tweets(self, user_id, since_id=None, **kwargs):
+            self.since_ids.append(since_id)
+            tweets = [MockTweet(tweet_id) for tweet_id in (4, 3, 2, 1) if since_id is None or tweet_id > since_id]
+            return type('Response', (), {'data': tweets, 'meta': {}})()
+
+        def create_tweet(self, text, in_reply_to_tweet_id, **kwargs):
+            self.posted.append(in_reply_to_tweet_id)
+
+    client = MockClient()
+    account = {'username': 'test_user', 'use_gpt': False, 'custom_prompt': '{tweet_text}', 'predefined_replies': ['hi']}
+    config = {'accounts_to_reply': [account], 'max_queued_replies': 2}
+    x_api.reply_to_tweets(pool_of(client), config, True)
+    assert client.posted == [4] and x_api.scheduler.pending() == 1  # Tweets 2 and 1 are left for a later cycle
+    clock.now += x_api.REPLY_WAIT_END
+    x_api.scheduler.run_pending()
+    assert client.posted == [4, 3] and x_api.since_id_store.get(7) is None
+
+    # since_id stayed below the held back tweets, so they are fetched again
+    x_api.reply_to_tweets(pool_of(client), config, True)
+    for _ in range(2):
+        clock.now += x_api.REPLY_WAIT_END
+        x_api.scheduler.run_pending()
+    assert client.posted == [4, 3, 2, 1]
+    assert client.since_ids == [None, None]
+    assert x_api.since_id_store.get(7) == 4
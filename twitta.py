@@ -1,40 +1,81 @@
+import time
+_process_start = time.perf_counter()
+
+import atexit
 import config_json
-import datetime
-import openai
+import log
 import random
 import signal
+from contextlib import contextmanager
 from datetime import datetime
-import time
-import tweepy
-import tweepy.errors
 import utils
-import x_api
 from log import app_logger as logger
 from utils import __version__
-from web_server import create_server
 import threading
 import sys
 
+# tweepy, openai and flask are slow to import, so the bot and web modules are
+# imported on first use by the commands that need them (see _setup_bot)
+_x_api_client = None
+_timings = [('imports', time.perf_counter() - _process_start)]
+
 def main():
     logger.info(f"Starting twitta {__version__}...")
     _setup_environment()
     
-    config = config_json.load_config()
+    with _timed('config'):
+        config = config_json.load_config()
+        log.set_log_format(config.get('log_format', 'text'))
     logger.info(f"Configuration loaded.")
     
-    x_api_client = _setup_api(config)
+    if '-d' in sys.argv:
+        _setup_bot(config)
+        _report_timings()
+        _run_daemon_mode(config)
+    else:
+        _report_timings()
+        _handle_interactive_mode(config)
+
+@contextmanager
+def _timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings.append((phase, time.perf_counter() - started))
+
+def _report_timings():
+    """Log how long each startup phase took since the last report"""
+    if not _timings:
+        return
+    phases = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in _timings)
+    logger.info(f"Startup timing: {phases} (total {sum(seconds for _, seconds in _timings) * 1000:.0f} ms)")
+    _timings.clear()
+
+def _setup_bot(config):
+    """Set up the reply store and API clients the first time a command needs them"""
+    global _x_api_client
+    if _x_api_client is not None:
+        return _x_api_client
+    with _timed('bot modules'):
+        import x_api
+        from reply_store import create_reply_store
+    with _timed('reply store'):
+        x_api.reply_store = create_reply_store(config)
+        atexit.register(x_api.reply_store.close)
+        x_api.state.update(tweet_count=x_api.reply_store.count())
+    with _timed('api clients'):
+        _x_api_client = _setup_api(config)
     logger.info(f"API initialized.")
     
     x_api.start_time = datetime.now()
     logger.info(f"Start time is: {x_api.start_time}")
-    
-    if '-d' in sys.argv:
-        _run_daemon_mode(config, x_api_client)
-    else:
-        _handle_interactive_mode(config, x_api_client)
+    return _x_api_client
         
-def _handle_interactive_mode(config, x_api_client):
+def _handle_interactive_mode(config):
     while True:
+        # Prompts follow the log lines, so log to a terminal synchronously while the menu is up
+        log.set_synchronous_console(sys.stdin is not None and sys.stdin.isatty())
         print("\nAvailable commands:")
         print("1. add          - Add a new Twitter account to reply to")
         print("2. run          - Run the bot with manual approval") 
@@ -51,9 +92,16 @@ def _handle_interactive_mode(config, x_api_client):
         if command == 'add':
             config_json.add_new_account(config)
         elif command in ['run', 'run-headless']:
-            _run_normal_mode(config, x_api_client, command == 'run-headless')
+            if command == 'run-headless':
+                log.set_synchronous_console(False)  # Nothing to prompt for, keep logging off the bot's threads
+            _setup_bot(config)
+            _report_timings()
+            _run_normal_mode(config, command == 'run-headless')
         elif command == 'daemon':
-            _run_daemon_mode(config, x_api_client)
+            log.set_synchronous_console(False)  # Keep logging off the request and bot threads
+            _setup_bot(config)
+            _report_timings()
+            _run_daemon_mode(config)
         elif command == 'adduser':
             config_json.add_web_user(config)
         elif command == 'deluser':
@@ -68,19 +116,24 @@ def _handle_interactive_mode(config, x_api_client):
         else:
             print("Invalid command.")
 
-def _run_normal_mode(config, x_api_client, auto_reply):
+def _run_normal_mode(config, auto_reply):
+    import x_api
     logger.info(f"Running in auto-reply mode: {str(auto_reply)}")
+    config_store = config_json.ConfigStore(config)
     while True:
-        x_api.reply_to_tweets(x_api_client, config, auto_reply)
+        config_store.check_for_changes()  # Pick up accounts edited in config.json while running
+        x_api.reply_to_tweets(_x_api_client, config, auto_reply)
         wait_time = random.randint(60, 300)
         logger.info(f"Waiting for {wait_time} seconds before the next tweet check.")
-        time.sleep(wait_time)
+        x_api.scheduler.run_for(wait_time)  # Keeps posting queued replies while waiting
 
-def _run_daemon_mode(config, x_api_client):
+def _run_daemon_mode(config):
     try:
         logger.info("Starting web interface...")
         try:
-            server = create_server(config, x_api_client)
+            with _timed('web modules'):
+                from web_server import create_server
+            server = create_server(config, _x_api_client)
         except Exception as e:
             logger.error(f"Failed to create web server: {str(e)}! Shutting down web interface...")
             return
@@ -109,6 +162,10 @@ def _run_daemon_mode(config, x_api_client):
                 logger.info("Received shutdown signal... Shutting down web interface...")
                 break
                 
+        # Let a running bot finish its current post and flush stored replies
+        server.worker.stop(wait=True)
+        server.config_store.close()
+        
     except Exception as e:
         logger.error(f"Unexpected error in daemon mode: {str(e)}! Shutting down web interface...")
         return
@@ -117,22 +174,46 @@ def _setup_environment():
     # Register the Ctrl+C handler
     signal.signal(signal.SIGINT, utils._handle_exit)
     
-    # Start and update
-    logger.info("Checking for updates...")
-    utils.update_repo()
+    # Check for updates in the background, it can take a while or hang without network.
+    # What an earlier check fetched is applied first, before any module is imported lazily
+    if '--no-update' in sys.argv:
+        logger.info("Skipping update check (--no-update).")
+    else:
+        utils.apply_fetched_update()
+        logger.info("Checking for updates in the background...")
+        utils.start_update_check()
     
 def _setup_api(config):
+    import gpt
+    import x_api
+    import http_pool
+    from client_pool import ClientPool
+    http_settings = http_pool.settings(config)
+    clients = ClientPool()
+    clients.add('default', _create_client(config['twitter'], http_settings))
+    for i, app in enumerate(config.get('twitter_apps', []), start=1):
+        clients.add(app.get('name', f'app{i}'), _create_client(app, http_settings))
+    x_api.configure_pipeline(config)
+    gpt.set_api_key(config['openai']['api_key'])
+    gpt.configure_http(config)
+    gpt.configure_cache(config)
+    atexit.register(gpt.response_cache.save)
+    return clients
+
+def _create_client(credentials, http_settings):
+    import http_pool
+    import tweepy
     try:
         client = tweepy.Client(
-            bearer_token=config['twitter']['bearer_token'],
-            consumer_key=config['twitter']['consumer_key'],
-            consumer_secret=config['twitter']['consumer_secret'],
-            access_token=config['twitter']['access_token'],
-            access_token_secret=config['twitter']['access_token_secret']
+            bearer_token=credentials['bearer_token'],
+            consumer_key=credentials['consumer_key'],
+            consumer_secret=credentials['consumer_secret'],
+            access_token=credentials['access_token'],
+            access_token_secret=credentials['access_token_secret']
         )
     except tweepy.errors.TweepyException as e:
         utils.fatal_error(f"Failed to initialize Twitter API client: {e}!")
-    openai.api_key = config['openai']['api_key']
+    http_pool.configure_session(client.session, **http_settings)
     return client
 
 if __name__ == "__main__":
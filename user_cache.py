@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+import utils
+from log import api_logger as logger
+
+CACHE_FILE = os.path.join('data', 'user_ids.json')
+CACHE_TTL = 7 * 24 * 60 * 60  # User IDs practically never change, refresh weekly
+
+class UserIdCache:
+    """Persistent username -> user ID cache with per-entry expiry"""
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}  # lowercased username: (user_id, resolved_at)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def get(self, username):
+        """Return the cached user ID for username, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(username.lower())
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def update(self, user_ids):
+        """Store freshly resolved username: user_id pairs"""
+        now = time.time()
+        with self._lock:
+            for username, user_id in user_ids.items():
+                self._entries[username.lower()] = (user_id, now)
+            self._dirty = self._dirty or bool(user_ids)
+
+    def invalidate(self, username):
+        """Drop a cached entry, e.g. after the API reports the user as not found"""
+        with self._lock:
+            if self._entries.pop(username.lower(), None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {username: list(entry) for username, entry in self._entries.items()}
+            self._dirty = False
+        try:
+            utils.atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.error(f"Failed to save user ID cache to {self.path}: {e}")
+
+    def _load(self):
+        try:
+            data = utils.read_json(self.path)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable user ID cache {self.path}: {e}")
+            return
+        self._entries = {username: tuple(entry) for username, entry in data.items()}
@@ -1,26 +1,46 @@
 import sys
 import platform
-import requests
 import subprocess
 import os
-from packaging import version
+import json
+import tempfile
+import threading
+import log
 from log import app_logger as logger
 
 __version__ = "0.3"
 APP_REPO = "https://api.github.com/repos/steelproxy/twitta/releases/latest"
 
+# Bounds on the update check so a slow or missing network never stalls twitta
+UPDATE_HTTP_TIMEOUT = 10
+UPDATE_COMMAND_TIMEOUT = 120
+
+def start_update_check():
+    """Run update_repo on a background thread, returns the thread"""
+    def check():
+        try:
+            update_repo()
+        except Exception as e:
+            logger.error(f"Update check failed: {e}. Skipping update...")
+    thread = threading.Thread(target=check, name='update-check', daemon=True)
+    thread.start()
+    return thread
+
 def update_repo():  # Update code from GitHub
     """Run the update script to fetch the latest code from GitHub."""
     
     # Determine if application is a script file or frozen exe
     if getattr(sys, 'frozen', False):
+        import requests
+        from packaging import version
+        
         # Get current executable path and version
         current_exe = sys.executable
         current_version = version.parse(__version__)
         system_platform = platform.system().lower()
         
         # Get latest release from GitHub
-        response = requests.get(APP_REPO)
+        response = requests.get(APP_REPO, timeout=UPDATE_HTTP_TIMEOUT)
         if response.status_code != 200:
             raise Exception("Failed to fetch release info")
         
@@ -46,7 +66,7 @@ def update_repo():  # Update code from GitHub
         # Download new version
         logger.info(f"Downloading update {latest_version}...")
         try:
-            response = requests.get(asset['browser_download_url'], stream=True)
+            response = requests.get(asset['browser_download_url'], stream=True, timeout=UPDATE_HTTP_TIMEOUT)
             if response.status_code != 200:
                 logger.error(f"Failed to download update! Response code: {response.status_code}. Skipping update...")
                 return
@@ -56,7 +76,6 @@ def update_repo():  # Update code from GitHub
         
         try:
             # Save to temporary file
-            import tempfile
             temp_dir = tempfile.mkdtemp()
             temp_path = os.path.join(temp_dir, 'update.exe')
 
@@ -77,25 +96,89 @@ def update_repo():  # Update code from GitHub
         try:
             subprocess.run(["git", "--version"], 
                         check=True, capture_output=True)  # Verify git installation
-            subprocess.run(["git", "pull"], check=True)     # Pull latest changes
-            
-            # Add dependency update
-            requirements_file = os.path.join(os.path.dirname(__file__), 'requirements.txt')
-            if os.path.exists(requirements_file):
-                logger.info("Installing updated dependencies...")
-                try:
-                    subprocess.run([sys.executable, "-m", "pip", "install", "-r", requirements_file], 
-                                check=True, capture_output=True)
-                    logger.info("Dependencies updated successfully.")
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"Failed to update dependencies: {e}")
-            
-            logger.info("Repository updated successfully.")
+            # Only fetch, merging while modules are still being imported could load a mix of versions
+            subprocess.run(["git", "fetch"], check=True,
+                        capture_output=True, timeout=UPDATE_COMMAND_TIMEOUT)
+            behind = _commits_behind()
+            if behind:
+                logger.info(f"Fetched {behind} new commit(s), the update is applied on the next start.")
+            else:
+                logger.info(f"Already running latest version of twitta: {__version__}")
+        except subprocess.TimeoutExpired:
+            logger.warning(f"git fetch did not finish within {UPDATE_COMMAND_TIMEOUT} seconds. Skipping update...")
         except (subprocess.CalledProcessError, FileNotFoundError):
             logger.warning("Git not found in PATH. Skipping update...")
         except Exception as e:
            logger.error(f"Failed to download update! Exception occurred: {e}. Skipping update...")
-           
+
+def apply_fetched_update():
+    """Merge commits fetched by an earlier update check and restart twitta on them.
+
+    Runs at startup before anything is imported lazily, so the process never
+    mixes old and new modules. Frozen executables replace themselves when the
+    update is downloaded and are left alone.
+    """
+    if getattr(sys, 'frozen', False):
+        return
+    try:
+        behind = _commits_behind()
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return  # Not a git checkout or no upstream branch, nothing was fetched
+    if not behind:
+        return
+
+    logger.info(f"Applying {behind} fetched commit(s)...")
+    try:
+        subprocess.run(["git", "merge", "--ff-only", "@{u}"], check=True,
+                    capture_output=True, timeout=UPDATE_COMMAND_TIMEOUT)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        logger.error(f"Failed to apply update: {e}. Skipping update...")
+        return
+
+    # Add dependency update
+    requirements_file = os.path.join(os.path.dirname(__file__), 'requirements.txt')
+    if os.path.exists(requirements_file):
+        logger.info("Installing updated dependencies...")
+        try:
+            subprocess.run([sys.executable, "-m", "pip", "install", "-r", requirements_file], 
+                        check=True, capture_output=True, timeout=UPDATE_COMMAND_TIMEOUT)
+            logger.info("Dependencies updated successfully.")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logger.error(f"Failed to update dependencies: {e}")
+
+    logger.info("Repository updated successfully, restarting...")
+    # execv skips atexit, write out the queued log records the way its hook would
+    log.log_writer.stop()
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+def _commits_behind():
+    """Number of commits the upstream branch is ahead of HEAD, as of the last fetch"""
+    result = subprocess.run(["git", "rev-list", "--count", "HEAD..@{u}"], check=True,
+                            capture_output=True, text=True, timeout=UPDATE_COMMAND_TIMEOUT)
+    return int(result.stdout.strip() or 0)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def atomic_write_json(path, data, indent=None):
+    """Write data as JSON to a temp file, fsync it and rename it over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
 def fatal_error(message):
     logger.fatal("A fatal error has occurred and twitta must exit.")
     logger.fatal(message)
@@ -1,15 +1,48 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash
+from flask import Flask, Response, g, jsonify, request, render_template, redirect, url_for, flash, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import threading
+import atexit
+import hmac
 from datetime import datetime, timedelta
 import time
+import gzip
+import gpt
+import metrics
 import x_api
 import os
 import logging
-import json
-from log import web_logger, api_logger
-from collections import deque
+import queue
+from account_registry import AccountRegistry
+from bot_worker import BotWorker
+from config_json import ConfigStore
+from event_hub import EventHub, EventHubLogHandler, format_sse
+from log_format import LOG_DATE_FORMAT, LOG_FORMAT, STRUCTURED_FIELDS, parse_line, to_text_line
+from log_index import read_log_range
+from log import app_logger, web_logger, api_logger, log_writer
+
+LOG_FILES = {
+    'web': 'logs/web.log',
+    'api': 'logs/api.log',
+    'app': 'logs/twitta.log'
+}
+INITIAL_LOG_LINES = {'web': 100, 'api': 100, 'app': 1000}
+LOG_READ_CHUNK = 64 * 1024
+MAX_LOG_DELTA = 1024 * 1024  # Upper bound on bytes returned by a single incremental poll
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+MAX_QUERY_LINES = 5000
+MAX_ACCOUNTS_PAGE = 500
+STREAM_KEEPALIVE = 15  # Seconds between comment lines on an idle event stream
+
+# Production serving (waitress): every open dashboard holds one thread for its event stream
+PRODUCTION_THREADS = 32
+CONNECTION_LIMIT = 200
+CHANNEL_TIMEOUT = 120  # Seconds before an idle keep-alive connection is closed
+GZIP_MIN_SIZE = 500
+GZIP_LEVEL = 5
+GZIP_MIMETYPES = {'application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript', 'text/plain'}
+
+request_latency = metrics.histogram('twitta_web_request_seconds', "Web interface request latency, up to the first byte of streamed responses",
+                                    ['endpoint', 'method', 'status'])
 
 class User(UserMixin):
     def __init__(self, username):
@@ -19,10 +52,15 @@ class User(UserMixin):
 class TwitterBotServer:
     def __init__(self, config, x_api_client):
         self.app = Flask(__name__, static_folder='static')
+        self.events = EventHub()
         self._setup_logging(config)
         self._init_server(config, x_api_client)
         self._setup_auth()
         self.setup_routes()
+        self.app.before_request(self._start_request_timer)
+        # after_request hooks run in reverse order, so the timer also covers compression
+        self.app.after_request(self._observe_request)
+        self.app.after_request(self._compress_response)
 
     def _setup_logging(self, config):
         """Configure logging for Flask and Werkzeug"""
@@ -37,24 +75,36 @@ class TwitterBotServer:
         werkzeug_logger = logging.getLogger('werkzeug')
         werkzeug_logger.setLevel(logging.WARNING)
         werkzeug_logger.handlers = []  # Clear existing handlers
-        werkzeug_logger.addHandler(self.logger.handlers[0])  # Use same handler as web logger
+        for handler in self.logger.handlers:  # Use same handlers as web logger
+            werkzeug_logger.addHandler(handler)
+        
+        # Push new log records to dashboard event streams, from the log writer thread
+        # so logging callers never wait on the fan-out
+        for listener in log_writer.listeners:
+            if isinstance(listener, EventHubLogHandler):
+                log_writer.remove_listener(listener)
+        sources = {logger.name: source for source, logger in (('web', web_logger), ('api', api_logger), ('app', app_logger))}
+        handler = EventHubLogHandler(self.events, sources)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+        log_writer.add_listener(handler)
 
     def _init_server(self, config, x_api_client):
         """Initialize server variables"""
         self.app.secret_key = config['web_interface']['secret_key']
         self.config = config
         self.client = x_api_client
-        self.bot_thread = None
         self.server_start_time = x_api.start_time
         self.config_file_path = os.getenv('CONFIG_PATH', 'config.json')
+        self.config_store = ConfigStore(config, path=self.config_file_path)
+        self.config_store.add_listener(self._on_config_reloaded)
+        self.accounts = AccountRegistry(config)
+        self.log_indexes = {}
         
-        # Bot state
-        self.running = False
-        self.start_time = None
-        self.tweet_count = 0
-        self.last_tweet = None
-        self.error_count = 0
-        self.status_message = ""
+        # Bot state, shared with the bot thread
+        self.state = x_api.state
+        self.state.add_listener(self._on_state_change)
+        self.clients = x_api_client  # client_pool.ClientPool
+        self.worker = BotWorker(x_api_client, config, self.state)
 
     def _setup_auth(self):
         """Configure Flask-Login"""
@@ -70,62 +120,12 @@ class TwitterBotServer:
             return check_password_hash(stored_credentials[username], password)
         return False
 
-    def _get_log_entries(self, log_file, max_lines=100):
-        """Get recent log entries from specified file"""
-        try:
-            with open(log_file, 'r') as f:
-                all_lines = f.readlines()
-                recent_logs = []
-                
-                for line in all_lines:
-                    try:
-                        timestamp_str = line.split(' - ')[0].strip().split(',')[0]
-                        log_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                        if log_time >= self.server_start_time:
-                            recent_logs.append(line)
-                    except (ValueError, IndexError):
-                        recent_logs.append(line)
-                
-                return recent_logs[-max_lines:]
-        except FileNotFoundError:
-            return ["Log file not found"]
-        except Exception as e:
-            return [f"Error reading logs: {str(e)}"]
-
-    def _run_bot(self):
-        """Internal method to run the bot"""
-        self.running = True
-        self.start_time = datetime.now()
-        self.status_message = "Bot is running"
-        self.error_count = 0
-        self.api_logger.info("Bot thread started")
-        
-        def update_status(message):
-            self.status_message = message
-            
-        def update_tweet_count(count):
-            self.tweet_count = count
-            self.last_tweet = datetime.now()
-            
-        def handle_error(error_msg):
-            self.error_count += 1
-            self.status_message = f"Error: {error_msg}"
-        
-        # Register callbacks
-        x_api.register_callbacks(
-            status_update_callback=update_status,
-            tweet_count_callback=update_tweet_count,
-            error_callback=handle_error
-        )
-        
-        while self.running:
-            try:
-                update_status("Running tweet reply cycle.")
-                x_api.reply_to_tweets(self.client, self.config, True)
-            except Exception as e:
-                handle_error(str(e))
-            update_status("Tweet reply cycle complete. Waiting 60 seconds before next cycle...")
-            time.sleep(60)
+    @staticmethod
+    def _local_time(timestamp):
+        """Convert a timestamp to naive local time, as written in the log files"""
+        if timestamp.tzinfo is not None:
+            return timestamp.astimezone().replace(tzinfo=None)
+        return timestamp
 
     def setup_routes(self):
         """Set up all Flask routes"""
@@ -155,7 +155,8 @@ class TwitterBotServer:
         host = request.host
         
         if current_user.is_authenticated:
-            self.logger.info(f"Already authenticated user accessed login page: {current_user.username} from {ip} ({host})")
+            self.logger.info(f"Already authenticated user accessed login page: {current_user.username} from {ip} ({host})",
+                             extra={'event': 'login_page', 'ip': ip})
             return redirect(url_for('dashboard'))
             
         if request.method == 'POST':
@@ -176,7 +177,8 @@ class TwitterBotServer:
             if ip in self.auth_attempts:
                 attempts, timestamp = self.auth_attempts[ip]
                 if attempts >= 5:  # Max 5 attempts per 15 minutes
-                    self.logger.warning(f"Authentication failed - Too many attempts from {ip} ({host}) [BANNED]")
+                    self.logger.warning(f"Authentication failed - Too many attempts from {ip} ({host}) [BANNED]",
+                                        extra={'event': 'auth_banned', 'ip': ip})
                     return "Too many login attempts", 429
                     
             username = request.form.get('username')
@@ -187,7 +189,8 @@ class TwitterBotServer:
                 if ip in self.auth_attempts:
                     del self.auth_attempts[ip]
                 login_user(User(username))
-                self.logger.info(f"Authentication successful - User: {username} from {ip} ({host})")
+                self.logger.info(f"Authentication successful - User: {username} from {ip} ({host})",
+                                 extra={'event': 'auth_success', 'ip': ip})
                 next_page = request.args.get('next')
                 return redirect(next_page or url_for('dashboard'))
                 
@@ -196,7 +199,8 @@ class TwitterBotServer:
                 self.auth_attempts.get(ip, (0, current_time))[0] + 1,
                 current_time
             )
-            self.logger.warning(f"Authentication failed - Invalid credentials from {ip} ({host}) for user: {username}")
+            self.logger.warning(f"Authentication failed - Invalid credentials from {ip} ({host}) for user: {username}",
+                                extra={'event': 'auth_failed', 'ip': ip})
             flash('Invalid username or password')
             
         return render_template('login.html')
@@ -208,7 +212,7 @@ class TwitterBotServer:
             ip = request.remote_addr
             host = request.host
             logout_user()
-            self.logger.info(f"User logged out: {username} from {ip} ({host})")
+            self.logger.info(f"User logged out: {username} from {ip} ({host})", extra={'event': 'logout', 'ip': ip})
         return redirect(url_for('login'))
 
     def _setup_api_routes(self):
@@ -228,24 +232,43 @@ class TwitterBotServer:
         def stop_bot():
             return self._handle_stop_bot()
 
+        @self.app.route('/api/restart', methods=['POST'])
+        @login_required
+        def restart_bot():
+            return self._handle_restart_bot()
+
         @self.app.route('/api/status')
         @login_required
         def get_status():
             return self._handle_get_status()
 
+        @self.app.route('/api/stream')
+        @login_required
+        def stream():
+            return self._handle_stream()
+
         @self.app.route('/api/logs')
         @login_required
         def get_logs():
             """Get log entries based on source"""
             source = request.args.get('source', 'web')
-            if source == 'web':
-                return self._handle_get_logs('logs/web.log')
-            elif source == 'api':
-                return self._handle_get_logs('logs/api.log')
-            elif source == 'app':
-                return self._handle_get_logs('logs/twitta.log', tail=False)  # Set tail=False to show all entries
-            else:
+            if source not in LOG_FILES:
                 return jsonify({"logs": ["Invalid log source specified"]}), 400
+            if any(arg in request.args for arg in ('from', 'to', 'level')):
+                return self._handle_query_logs(LOG_FILES[source])
+            since = request.args.get('since', type=int)
+            file_id = request.args.get('file_id')
+            return self._handle_get_logs(LOG_FILES[source], since=since, file_id=file_id,
+                                         max_lines=INITIAL_LOG_LINES[source])
+
+        @self.app.route('/api/logs/query')
+        @login_required
+        def query_logs():
+            """Get log entries as objects, filtered by time, level and structured fields"""
+            source = request.args.get('source', 'api')
+            if source not in LOG_FILES:
+                return jsonify({"entries": [], "error": "Invalid log source specified"}), 400
+            return self._handle_query_entries(LOG_FILES[source])
 
         @self.app.route('/accounts', methods=['GET'])
         @login_required
@@ -262,6 +285,15 @@ class TwitterBotServer:
             elif request.method == 'DELETE':
                 return self._handle_delete_account()
 
+        @self.app.route('/api/accounts/<username>', methods=['GET'])
+        @login_required
+        def get_account(username):
+            return self._handle_get_account(username)
+
+        @self.app.route('/metrics')
+        def get_metrics():
+            return self._handle_metrics()
+
     def _handle_dashboard(self):
         """Handle dashboard request"""
         ip = request.remote_addr
@@ -274,14 +306,13 @@ class TwitterBotServer:
         ip = request.remote_addr
         host = request.host
         
-        if self.running:
+        if self.state.running:
             self.logger.warning(f"User {current_user.username} from {ip} ({host}) attempted to start already running bot")
             return jsonify({"status": "error", "message": "Bot is already running"}), 400
+        if not self.worker.start():
+            return jsonify({"status": "error", "message": "Bot is still stopping, try again shortly"}), 409
         
         self.logger.info(f"Bot started by user: {current_user.username} from {ip} ({host})")
-        self.bot_thread = threading.Thread(target=self._run_bot)
-        self.bot_thread.daemon = True
-        self.bot_thread.start()
         return jsonify({"status": "success", "message": "Bot started successfully"})
 
     def _handle_stop_bot(self):
@@ -289,50 +320,216 @@ class TwitterBotServer:
         ip = request.remote_addr
         host = request.host
         
-        if not self.running:
+        if not self.worker.stop():
             self.logger.warning(f"User {current_user.username} from {ip} ({host}) attempted to stop inactive bot")
             return jsonify({"status": "error", "message": "Bot is not running"}), 400
         
         self.logger.info(f"Bot stopped by user: {current_user.username} from {ip} ({host})")
-        self.running = False
-        self.status_message = "Bot has been stopped."
         return jsonify({"status": "success", "message": "Bot stopped successfully"})
 
+    def _handle_restart_bot(self):
+        """Handle bot restart request, starts the bot if it was stopped"""
+        ip = request.remote_addr
+        host = request.host
+        
+        if not self.worker.restart():
+            return jsonify({"status": "error", "message": "Bot is still stopping, try again shortly"}), 409
+        
+        self.logger.info(f"Bot restarted by user: {current_user.username} from {ip} ({host})")
+        return jsonify({"status": "success", "message": "Bot restarted successfully"})
+
     def _handle_get_status(self):
         """Handle status request"""
-        uptime = str(datetime.now() - self.start_time) if self.start_time else "Not started"
-        last_tweet = self.last_tweet.isoformat() if self.last_tweet else None
-        
-        return jsonify({
-            "running": self.running,
-            "uptime": uptime,
-            "tweet_count": len(x_api.replied_tweet_ids),
-            "last_tweet": last_tweet,
-            "error_count": self.error_count,
-            "status_message": self.status_message
-        })
+        return jsonify(self._status_snapshot())
 
-    def _handle_get_logs(self, log_file, tail=True):
-        """Read log file contents"""
+    def _handle_metrics(self):
+        """Serve metrics in the Prometheus text format, to logged in users or with the metrics bearer token"""
+        token = self.config['web_interface'].get('metrics_token')
+        authorization = request.headers.get('Authorization', '')
+        if not current_user.is_authenticated and not (token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())):
+            ip = request.remote_addr
+            self.logger.warning(f"Unauthorized metrics request from {ip} ({request.host})", extra={'event': 'metrics_denied', 'ip': ip})
+            return "Unauthorized", 401
+        return Response(metrics.registry.render() + self._render_gauges(), content_type=metrics.CONTENT_TYPE)
+
+    def _render_gauges(self):
+        """Gauges read from the bot at scrape time"""
+        state = self.state.snapshot()
+        running = metrics.Gauge('twitta_bot_running', "1 while the bot thread is running")
+        running.set(int(state["running"]))
+        errors = metrics.Gauge('twitta_bot_errors', "Errors since the bot was last started")
+        errors.set(state["error_count"])
+        remaining = metrics.Gauge('twitta_rate_limit_remaining', "X API calls left in the current window per app and endpoint",
+                                  ['app', 'endpoint'])
+        for app, endpoint, calls in self.clients.rate_limits():
+            remaining.set(calls, app=app, endpoint=endpoint)
+        queued = metrics.Gauge('twitta_stage_queue_depth', "Items waiting for each pipeline stage", ['stage'])
+        utilization = metrics.Gauge('twitta_stage_utilization', "Share of worker time each pipeline stage was busy", ['stage'])
+        for stage, stats in x_api.pipeline_stats().items():
+            queued.set(stats["queue_depth"], stage=stage)
+            utilization.set(stats["utilization"], stage=stage)
+        return "".join(gauge.render() for gauge in (running, errors, remaining, queued, utilization))
+
+    def _status_snapshot(self):
+        """Bot state with the pipeline, connection pool and cache stats, for /api/status and new streams"""
+        return {
+            **self._state_status(self.state.snapshot()),
+            "gpt_cache": gpt.response_cache.stats(),
+            "pipeline": x_api.pipeline_stats(),
+            "x_apps": self.clients.stats(),
+            "openai_connections": gpt.connections.stats()
+        }
+
+    @staticmethod
+    def _state_status(state):
+        start_time = state["start_time"]
+        last_tweet = state["last_tweet"]
+        
+        return {
+            "running": state["running"],
+            "uptime": str(datetime.now() - start_time) if start_time else "Not started",
+            "started_at": start_time.isoformat() if start_time else None,
+            "tweet_count": state["tweet_count"],
+            "last_tweet": last_tweet.isoformat() if last_tweet else None,
+            "error_count": state["error_count"],
+            "status_message": state["status_message"]
+        }
+
+    def _on_state_change(self, snapshot):
+        # Runs on the thread that changed the state, so only the snapshot it was given is sent
+        if self.events.subscriber_count():
+            self.events.publish('status', self._state_status(snapshot))
+
+    def _handle_stream(self):
+        """Stream status changes and new log lines as Server-Sent Events"""
+        subscriber = self.events.subscribe()
+        initial_status = self._status_snapshot()
+
+        def generate():
+            try:
+                yield format_sse('status', initial_status)
+                while True:
+                    try:
+                        event, data = subscriber.get(timeout=STREAM_KEEPALIVE)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield format_sse(event, data)
+            finally:
+                self.events.unsubscribe(subscriber)
+
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop reverse proxies from buffering the stream
+        return response
+
+    def _handle_get_logs(self, log_file, since=None, file_id=None, max_lines=100):
+        """Read log lines, either the last max_lines or only those written after byte offset `since`"""
         try:
             if not os.path.exists(log_file):
-                return jsonify({"logs": ["No log file found"]})
+                return jsonify({"logs": ["No log file found"], "offset": 0})
             
-            with open(log_file, 'r') as f:
-                if tail:
-                    # Get last 100 lines for web and API logs
-                    lines = deque(f, 100)
+            with open(log_file, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                current_file_id = str(os.fstat(f.fileno()).st_ino)
+                # The offset belongs to another file if the log was rotated, or is stale if it was truncated
+                reset = since is not None and (since > size or (file_id is not None and file_id != current_file_id))
+                if since is None or reset:
+                    lines = self._read_tail(f, size, max_lines)
+                    offset = size
                 else:
-                    # Get all lines for application log
-                    lines = f.readlines()
+                    lines, offset = self._read_from(f, since)
                 
                 # Clean up line endings consistently
-                cleaned_lines = [line.rstrip('\n') for line in lines]
-                return jsonify({"logs": cleaned_lines})
+                cleaned_lines = [to_text_line(line.decode('utf-8', errors='replace').rstrip('\r\n')) for line in lines]
+                return jsonify({"logs": cleaned_lines, "offset": offset, "file_id": current_file_id, "reset": reset})
         except Exception as e:
             self.api_logger.error(f"Error reading log file: {str(e)}")
             return jsonify({"logs": ["Error reading log file"]})
 
+    def _handle_query_logs(self, log_file):
+        """Return log lines in a time range (ISO 8601 from/to), optionally filtered by level"""
+        try:
+            start = self._parse_log_time(request.args.get('from'))
+            end = self._parse_log_time(request.args.get('to'))
+        except ValueError:
+            return jsonify({"logs": ["Invalid from/to timestamp, expected ISO 8601"]}), 400
+        level = request.args.get('level')
+        if level and level.upper() not in LOG_LEVELS:
+            return jsonify({"logs": ["Invalid log level specified"]}), 400
+        limit = min(request.args.get('limit', MAX_QUERY_LINES, type=int), MAX_QUERY_LINES)
+        try:
+            lines, truncated = read_log_range(log_file, start=start, end=end, level=level, limit=limit,
+                                              indexes=self.log_indexes.setdefault(log_file, {}))
+            return jsonify({"logs": [to_text_line(line) for line in lines], "truncated": truncated})
+        except Exception as e:
+            self.api_logger.error(f"Error querying log file: {str(e)}")
+            return jsonify({"logs": ["Error reading log file"]})
+
+    def _handle_query_entries(self, log_file):
+        """Return parsed log entries in a time range, filtered by level and exact structured field values"""
+        try:
+            start = self._parse_log_time(request.args.get('from'))
+            end = self._parse_log_time(request.args.get('to'))
+        except ValueError:
+            return jsonify({"entries": [], "error": "Invalid from/to timestamp, expected ISO 8601"}), 400
+        level = request.args.get('level')
+        if level and level.upper() not in LOG_LEVELS:
+            return jsonify({"entries": [], "error": "Invalid log level specified"}), 400
+        limit = min(request.args.get('limit', MAX_QUERY_LINES, type=int), MAX_QUERY_LINES)
+        filters = {field: request.args[field] for field in STRUCTURED_FIELDS if field in request.args}
+
+        def match(line):
+            # Cheap substring test first, only lines that might match are decoded
+            if any(value not in line for value in filters.values()):
+                return False
+            entry = parse_line(line)
+            return all(str(entry.get(field)) == value for field, value in filters.items())
+
+        try:
+            lines, truncated = read_log_range(log_file, start=start, end=end, level=level, limit=limit,
+                                              indexes=self.log_indexes.setdefault(log_file, {}),
+                                              match=match if filters else None)
+            return jsonify({"entries": self._parse_entries(lines), "truncated": truncated})
+        except Exception as e:
+            self.api_logger.error(f"Error querying log file: {str(e)}")
+            return jsonify({"entries": [], "error": "Error reading log file"}), 500
+
+    @staticmethod
+    def _parse_entries(lines):
+        """Parse log lines into entries, folding continuation lines (tracebacks) into the preceding entry"""
+        entries = []
+        for line in lines:
+            entry = parse_line(line)
+            if 'time' not in entry and entries:
+                entries[-1]['message'] += '\n' + line
+            else:
+                entries.append(entry)
+        return entries
+
+    def _parse_log_time(self, value):
+        return self._local_time(datetime.fromisoformat(value)) if value else None
+
+    def _read_tail(self, f, size, max_lines):
+        """Return the last max_lines lines by reading backwards from the end of the file"""
+        data = b''
+        position = size
+        while position > 0 and data.count(b'\n') <= max_lines:
+            step = min(LOG_READ_CHUNK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+        return data.splitlines(keepends=True)[-max_lines:]
+
+    def _read_from(self, f, offset):
+        """Return complete lines written after offset and the offset just past them"""
+        f.seek(offset)
+        data = f.read(MAX_LOG_DELTA)
+        end = data.rfind(b'\n') + 1  # Leave a partially written last line for the next poll
+        if end == 0 and len(data) == MAX_LOG_DELTA:
+            end = len(data)  # A single line longer than the limit, return it in pieces
+        return data[:end].splitlines(keepends=True), offset + end
+
     def _handle_manage_accounts(self):
         """Handle accounts page request"""
         ip = request.remote_addr
@@ -341,11 +538,32 @@ class TwitterBotServer:
         return render_template('accounts.html')
 
     def _handle_get_accounts(self):
-        """Return list of accounts to reply to"""
-        return jsonify({
-            "accounts": self.config['accounts_to_reply'],
-            "running": self.running
+        """Return a page of accounts to reply to (offset, limit, q=username search), with an ETag"""
+        running = self.state.running
+        etag = f"{self.accounts.etag()}-{int(running)}"
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), MAX_ACCOUNTS_PAGE)
+        accounts, total = self.accounts.page(offset=offset, limit=limit, search=request.args.get('q'))
+        response = jsonify({
+            "accounts": accounts,
+            "total": total,
+            "offset": offset,
+            "running": running
         })
+        response.set_etag(etag)
+        return response
+
+    def _handle_get_account(self, username):
+        """Return a single account by username"""
+        account = self.accounts.get(username.lstrip('@'))
+        if account is None:
+            return jsonify({"status": "error", "message": "Account not found"}), 404
+        return jsonify(account)
 
     def _handle_update_account(self):
         """Update or add account configuration"""
@@ -366,25 +584,19 @@ class TwitterBotServer:
                 "predefined_replies": data.get('predefined_replies', [])
             }
 
-            # Find and update existing account or add new one
-            accounts = self.config['accounts_to_reply']
-            for i, account in enumerate(accounts):
-                if account['username'] == username:
+            # Update the existing account or add a new one
+            with self.config_store.lock:
+                if self.accounts.upsert(new_account):
+                    self.logger.info(f"Adding new account @{username} - GPT: {new_account['use_gpt']}")
+                else:
                     self.logger.info(f"Updating existing account @{username} - GPT: {new_account['use_gpt']}")
-                    accounts[i] = new_account
-                    break
-            else:
-                self.logger.info(f"Adding new account @{username} - GPT: {new_account['use_gpt']}")
-                accounts.append(new_account)
+                self.worker.reload_accounts(self.config['accounts_to_reply'])
 
-            # Save configuration
-            with open(self.config_file_path, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            self.config_store.save_soon()
 
             return jsonify({
                 "status": "success",
-                "message": "Account updated successfully",
-                "restart_required": self.running
+                "message": "Account updated successfully"
             })
         except Exception as e:
             self.logger.error(f"Error updating account @{username}: {str(e)}")
@@ -399,37 +611,74 @@ class TwitterBotServer:
         if not username:
             return jsonify({"status": "error", "message": "Username is required"}), 400
 
-        accounts = self.config['accounts_to_reply']
-        initial_length = len(accounts)
-        self.config['accounts_to_reply'] = [acc for acc in accounts if acc['username'] != username]
-        
-        if len(self.config['accounts_to_reply']) == initial_length:
-            return jsonify({"status": "error", "message": "Account not found"}), 404
+        with self.config_store.lock:
+            if not self.accounts.remove(username):
+                return jsonify({"status": "error", "message": "Account not found"}), 404
+            self.worker.reload_accounts(self.config['accounts_to_reply'])
 
-        self._save_config()
+        self.config_store.save_soon()
         return jsonify({
             "status": "success", 
-            "message": "Account deleted successfully",
-            "restart_required": self.running
+            "message": "Account deleted successfully"
         })
 
-    def _save_config(self):
-        """Save current configuration to file"""
-        try:
-            with open(self.config_file_path, 'w') as f:
-                json.dump(self.config, f, indent=4)
-            self.logger.info("Configuration saved successfully")
-        except Exception as e:
-            self.logger.error(f"Error saving configuration: {str(e)}")
-            raise
+    def _on_config_reloaded(self, config):
+        """Apply a config file edited outside the web interface"""
+        self.accounts.reload()
+        self.worker.reload_accounts(config['accounts_to_reply'])
+
+    def _start_request_timer(self):
+        g.request_started = time.monotonic()
+
+    def _observe_request(self, response):
+        started = g.get('request_started')
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'  # Route patterns keep label values bounded
+            request_latency.observe(time.monotonic() - started, endpoint=endpoint, method=request.method,
+                                    status=response.status_code)
+        return response
+
+    def _compress_response(self, response):
+        """Gzip larger text responses for clients that accept it, streamed responses are left alone"""
+        if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+                or response.mimetype not in GZIP_MIMETYPES or 'Content-Encoding' in response.headers
+                or 'gzip' not in request.headers.get('Accept-Encoding', '')):
+            return response
+        data = response.get_data()
+        if len(data) < GZIP_MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
 
     def start(self, host='0.0.0.0'):
-        """Start the Flask server"""
+        """Start the web server, waitress in production mode and the Flask development server otherwise.
+
+        Both serve requests from threads of this process, next to the bot thread, so they share
+        the bot state directly. Multiple worker processes would each get their own copy of it.
+        """
+        web_config = self.config['web_interface']
+        port = web_config['port']
+        self.config_store.start_watching()
+        atexit.register(self.config_store.close)
+        if web_config.get('server', 'development') == 'production':
+            try:
+                from waitress import serve
+            except ImportError:
+                self.logger.warning("waitress is not installed, falling back to the development server")
+            else:
+                self.logger.info(f"Serving with waitress on {host}:{port}")
+                serve(self.app, host=host, port=port, ident='twitta',
+                      threads=web_config.get('threads', PRODUCTION_THREADS),
+                      connection_limit=CONNECTION_LIMIT, channel_timeout=CHANNEL_TIMEOUT)
+                return
         self.app.run(
             host=host, 
-            port=self.config['web_interface']['port'], 
+            port=port, 
             debug=False, 
-            use_reloader=False
+            use_reloader=False,
+            threaded=True
         )
 
 def create_server(config, x_api_client):
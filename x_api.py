@@ -1,124 +1,497 @@
-import datetime
 import gpt
+import metrics
 import random
+import threading
 import time
 import tweepy
 import tweepy.errors
-from datetime import timedelta
-from datetime import datetime
+from bot_state import BotState
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from log import api_logger as logger
+from pipeline import Stage, StageMetrics, chain
+from rate_limit import RATE_LIMIT_WINDOW
+from reply_store import SqliteReplyStore
+from scheduler import Scheduler
+from since_ids import SinceIdStore
+from user_cache import UserIdCache
 
 # Wait times
 REPLY_WAIT_START = 60
 REPLY_WAIT_END = 300
+FETCH_ERROR_WAIT = 60
+RATE_LIMIT_WAIT = 15 * 60  # Fallback when a 429 carries no reset header
+
+# Scheduler keys, fetches are paced per account and posts globally
+POST_ACTION = ('post',)
+
+# Rate-limited endpoints, as named by rate_limit.endpoint_key
+USER_LOOKUP_ENDPOINT = 'GET /2/users/by'
+TIMELINE_ENDPOINT = 'GET /2/users/:id/tweets'
+POST_ENDPOINT = 'POST /2/tweets'
+
+# Pipeline stages: fetch -> generate -> approve (manual mode only) -> post.
+# Worker counts are overridable with config['fetch_concurrency'] and
+# config['generation_concurrency']; a full queue holds back the stage before it.
+FETCH_CONCURRENCY = 8
+GENERATION_CONCURRENCY = 8
+FETCH_QUEUE_SIZE = 64
+GENERATION_QUEUE_SIZE = 64
+APPROVAL_QUEUE_SIZE = 16
+
+# Usernames per multi-user lookup request (API maximum is 100)
+USER_LOOKUP_BATCH_SIZE = 100
+
+# Timeline pagination, only tweets newer than the account's since_id are requested.
+# Every page takes its own timeline call from the pool; when the quota runs out
+# mid-timeline the next fetch resumes from the saved pagination token.
+TIMELINE_PAGE_SIZE = 100
+MAX_TIMELINE_PAGES = 5
+
+# Replies being generated or waiting to be posted, about an hour of posts at the
+# default pacing. Overridable with config['max_queued_replies']; tweets over the
+# limit are left for a later cycle, since_id stays below them.
+MAX_QUEUED_REPLIES = 20
 
 # Track request counts and timestamps
-request_timestamps = []
+request_timestamps = deque()
 user_request_counts = {}
+_request_count_lock = threading.Lock()
 
 # Track replies and start time
-start_time = datetime.datetime.now(datetime.timezone.utc)
-replied_tweet_ids = set()
-
-# Add these callback functions at the top of the file
-def register_callbacks(status_update_callback=None, tweet_count_callback=None, error_callback=None):
-    global _status_update_callback, _tweet_count_callback, _error_callback
-    _status_update_callback = status_update_callback
-    _tweet_count_callback = tweet_count_callback
-    _error_callback = error_callback
-
-def _error_message(message):
-    logger.error(message)
-    if '_error_callback' in globals():
-        _error_callback(message)
-
-def _info_message(message):
-    logger.info(message)
-    if '_status_update_callback' in globals():
-        _status_update_callback(message)
-
-def _warning_message(message):
-    logger.warning(message)
-    if '_status_update_callback' in globals():
-        _status_update_callback(message)
+start_time = datetime.now(timezone.utc)
+reply_store = SqliteReplyStore()
+
+# Persistent username -> user ID mapping
+user_id_cache = UserIdCache()
+
+# Persistent per-account newest tweet ID
+since_id_store = SinceIdStore()
+
+# Pacing and backoff for fetches and posts, replaces inline sleeps
+scheduler = Scheduler()
+queued_tweet_ids = set()  # Replies being generated or waiting for their post slot
+
+# Fetched tweets per user ID, tweet ID: True once replied to or given up on.
+# since_id only moves past a tweet once it and every older one are settled,
+# so tweets still queued are fetched again after a restart.
+fetched_tweets = {}
+timeline_cursors = {}  # user ID: pagination token of the pages still to fetch, since_id holds until then
+_fetched_lock = threading.Lock()
+
+# Status and counters read by the web interface
+state = BotState()
+
+# Served on /metrics, tweet outcomes are fetched, replied, skipped (rejected at approval) or errored
+api_latency = metrics.histogram('twitta_x_api_request_seconds', "X API call latency", ['call'])
+tweet_counter = metrics.counter('twitta_tweets_total', "Tweets per account and outcome", ['account', 'outcome'])
+
+# Keyword fields (event, account, tweet_id, latency_ms) are attached to the
+# record for the JSON-lines log format, the text format ignores them
+
+def _error_message(message, **fields):
+    logger.error(message, extra=fields)
+    state.record_error(message)
+
+def _info_message(message, **fields):
+    logger.info(message, extra=fields)
+    state.set_status(message)
+
+def _warning_message(message, **fields):
+    logger.warning(message, extra=fields)
+    state.set_status(message)
 
 # Main function
 
-def reply_to_tweets(client, config, auto_reply):
-    for account in config['accounts_to_reply']:
-        account_username = account['username']
-        _info_message(f"Fetching tweets for @{account_username}...")
+def reply_to_tweets(clients, config, auto_reply, stop=None):
+    """Run one fetch/reply cycle over config['accounts_to_reply'].
+
+    Accounts are fetched a few at a time by the fetch stage while the tweets
+    of earlier accounts are already being answered by the generate stage.
+    Once stop (a threading.Event) is set, no more accounts are fetched and
+    nothing more is posted this cycle. Replies already being generated are
+    still queued, to be posted on the next run. clients is a
+    client_pool.ClientPool, each call goes to the app with the most quota.
+    """
+    clients.check_health()
+    # Accounts still backing off from a fetch error sit this cycle out
+    accounts = [account for account in config['accounts_to_reply']
+                if scheduler.is_ready(_fetch_key(account['username']))]
+    concurrency = config.get('fetch_concurrency', FETCH_CONCURRENCY)
+    max_queued = config.get('max_queued_replies', MAX_QUEUED_REPLIES)
+    user_ids = _resolve_user_ids(clients, [account['username'] for account in accounts])
+    generating = []
+    held_back = 0
+    for account, user_id, tweets, complete in _fetch_accounts(clients, accounts, user_ids, concurrency):
+        _track_tweets(user_id, tweets, complete)
+        for tweet in tweets:
+            if tweet.id in reply_store or tweet.id in queued_tweet_ids:
+                continue
+            if len(queued_tweet_ids) >= max_queued:
+                held_back += 1
+                continue
+            generating.append((account, tweet, _start_reply(account, tweet, auto_reply)))
+        if stop is not None and stop.is_set():
+            break
+        # Post whatever is due while the remaining accounts are still being fetched
+        scheduler.run_pending(stop=stop)
+    # Replies were generated concurrently, queue them for posting in fetch order
+    for account, tweet, reply in generating:
+        if stop is not None and stop.is_set() and not reply.done():
+            # Don't wait for generation when stopping, queue the reply once it arrives
+            reply.add_done_callback(lambda reply, account=account, tweet=tweet:
+                                    _queue_reply(clients, account, tweet, reply))
+        else:
+            _queue_reply(clients, account, tweet, reply)
+    if held_back:
+        _warning_message(f"Reply queue is full ({max_queued} replies), {held_back} tweet(s) left for a later cycle...")
+    scheduler.run_pending(stop=stop)
+    logger.info(f"Pipeline: {_format_stats(pipeline_stats())}")
+
+def configure_pipeline(config):
+    """Size the fetch and generate stages from the config, before the first cycle"""
+    global fetch_stage, generation_stage
+    fetch_workers = config.get('fetch_concurrency', FETCH_CONCURRENCY)
+    generation_workers = config.get('generation_concurrency', GENERATION_CONCURRENCY)
+    fetch_stage.close()
+    generation_stage.close()
+    fetch_stage = Stage('fetch', _fetch_account, fetch_workers, FETCH_QUEUE_SIZE)
+    generation_stage = Stage('generate', _generate_reply, generation_workers, GENERATION_QUEUE_SIZE)
+
+def pipeline_stats():
+    """Queue depth, throughput and utilization per stage, the busiest stage limits the run"""
+    return {
+        "fetch": fetch_stage.stats(),
+        "generate": generation_stage.stats(),
+        "approve": approval_stage.stats(),
+        "post": post_metrics.stats(workers=1, queue_depth=scheduler.pending())
+    }
+
+def _format_stats(stats):
+    return ", ".join(f"{name} {stage['per_minute']}/min queued {stage['queue_depth']} busy {stage['utilization']:.0%}"
+                     for name, stage in stats.items())
+
+# Fetching
+
+def _resolve_user_ids(clients, usernames):
+    """Map usernames to user IDs from the cache, looking up misses in batches"""
+    user_ids = {}
+    misses = []
+    for username in usernames:
+        user_id = user_id_cache.get(username)
+        if user_id is None:
+            misses.append(username)
+        else:
+            user_ids[username] = user_id
+
+    for i in range(0, len(misses), USER_LOOKUP_BATCH_SIZE):
+        batch = misses[i:i + USER_LOOKUP_BATCH_SIZE]
+        client = clients.acquire(USER_LOOKUP_ENDPOINT)
+        if client is None:
+            _warning_message(f"User lookup rate limit reached, {len(misses) - i} account(s) will be resolved next cycle...")
+            break
+        _info_message(f"Looking up user IDs for {len(batch)} account(s)...")
         try:
-            user = client.get_user(username=account_username)
-            if user.data:
-                user_id = user.data.id
-                tweets = client.get_users_tweets(user_id, max_results=5, start_time=start_time, tweet_fields=['created_at', 'text'])
-                
-                _info_message("Tweets fetched...")
-                for tweet in tweets.data:
-                    _process_tweet(client, tweet, account, user_id, auto_reply)
-            else:
-                _error_message(f"Fetched user contains no data! Account: {account_username}. Moving to next account...")
+            with api_latency.time(call='get_users'):
+                users = client.get_users(usernames=batch)
         except tweepy.errors.TweepyException as e:
-            _error_message(f"Tweepy error while fetching tweets for @{account_username}: {str(e).replace('\n', ' ')} Waiting 60 seconds...")
-            time.sleep(60)
-        except Exception as e:
-            _error_message(f"General error while fetching tweets for @{account_username}: {str(e).replace('\n', ' ')} Waiting 60 seconds...")
-            time.sleep(60)
+            clients.report_error(client, e)
+            _error_message(f"Tweepy error while looking up user IDs: {_single_line(e)}")
+            continue
+        found = {user.username.lower(): user.id for user in users.data or []}
+        resolved = {username: found[username.lower()] for username in batch if username.lower() in found}
+        user_id_cache.update(resolved)
+        user_ids.update(resolved)
+
+    user_id_cache.save()
+    return user_ids
+
+def _fetch_accounts(clients, accounts, user_ids, concurrency):
+    """Fetch tweets with up to concurrency accounts in flight, yielding results in account order"""
+    items = ((clients, account, user_ids.get(account['username'])) for account in accounts)
+    for result in fetch_stage.map(items, window=max(1, concurrency)):
+        if result:
+            yield result
+
+def _fetch_account(clients, account, user_id):
+    account_username = account['username']
+    if user_id is None:
+        _error_message(f"Unable to resolve user ID for @{account_username}. Moving to next account...",
+                       event='fetch_error', account=account_username)
+        return None
+
+    client = clients.acquire(TIMELINE_ENDPOINT)
+    if client is None:
+        wait = clients.delay(TIMELINE_ENDPOINT)
+        _warning_message(f"Timeline rate limit reached, skipping @{account_username} for {wait:.0f} seconds...",
+                         event='rate_limited', account=account_username)
+        scheduler.defer(_fetch_key(account_username), wait)
+        return None
+
+    _info_message(f"Fetching tweets for @{account_username}...", event='fetch_start', account=account_username)
+    started = time.monotonic()
+    try:
+        resumed = user_id in timeline_cursors
+        tweets, cursor = _fetch_new_tweets(clients, client, user_id)
+        if cursor:
+            timeline_cursors[user_id] = cursor
+        else:
+            timeline_cursors.pop(user_id, None)
+        tweet_counter.inc(len(tweets), account=account_username, outcome='fetched')
+        _info_message(f"Fetched {len(tweets)} new tweet(s) for @{account_username}...",
+                      event='fetch', account=account_username, latency_ms=_elapsed_ms(started))
+        return account, user_id, tweets, not (resumed or cursor)
+    except tweepy.errors.NotFound as e:
+        # The cached ID may be stale (account deleted or recreated), resolve it again next cycle
+        user_id_cache.invalidate(account_username)
+        user_id_cache.save()
+        _error_message(f"User @{account_username} not found: {_single_line(e)} Moving to next account...",
+                       event='fetch_error', account=account_username)
+    except tweepy.errors.TooManyRequests as e:
+        wait = clients.report_rate_limited(client, TIMELINE_ENDPOINT, RATE_LIMIT_WAIT)
+        _error_message(f"Too many requests while fetching tweets for @{account_username}! Skipping account for {wait:.0f} seconds...",
+                       event='rate_limited', account=account_username)
+        scheduler.defer(_fetch_key(account_username), wait)
+    except tweepy.errors.TweepyException as e:
+        clients.report_error(client, e)
+        _error_message(f"Tweepy error while fetching tweets for @{account_username}: {_single_line(e)} Skipping account for {FETCH_ERROR_WAIT} seconds...",
+                       event='fetch_error', account=account_username)
+        scheduler.defer(_fetch_key(account_username), FETCH_ERROR_WAIT)
+    except Exception as e:
+        _error_message(f"General error while fetching tweets for @{account_username}: {_single_line(e)} Skipping account for {FETCH_ERROR_WAIT} seconds...",
+                       event='fetch_error', account=account_username)
+        scheduler.defer(_fetch_key(account_username), FETCH_ERROR_WAIT)
+    return None
+
+def _fetch_new_tweets(clients, client, user_id):
+    """Page through tweets newer than the stored since_id (or the start time on first poll).
+
+    client makes the first call, every further page acquires its own from
+    clients. Returns the tweets and, if the quota ran out first, the
+    pagination token to resume from, None once the timeline was read.
+    """
+    since_id = since_id_store.get(user_id)
+    params = {'since_id': since_id} if since_id else {'start_time': start_time}
+    tweets = []
+    pagination_token = timeline_cursors.get(user_id)
+    for page_number in range(MAX_TIMELINE_PAGES):
+        if page_number:
+            client = clients.acquire(TIMELINE_ENDPOINT)
+            if client is None:
+                logger.info(f"Timeline rate limit reached, the remaining pages for user {user_id} are fetched next time")
+                return tweets, pagination_token
+        _increment_request_count(user_id)
+        try:
+            with api_latency.time(call='get_users_tweets'):
+                page = client.get_users_tweets(user_id, max_results=TIMELINE_PAGE_SIZE, pagination_token=pagination_token,
+                                               tweet_fields=['created_at', 'text'], **params)
+        except tweepy.errors.TooManyRequests:
+            if not page_number:
+                raise
+            clients.report_rate_limited(client, TIMELINE_ENDPOINT, RATE_LIMIT_WAIT)
+            return tweets, pagination_token
+        tweets.extend(page.data or [])
+        pagination_token = (page.meta or {}).get('next_token')
+        if not pagination_token:
+            break
+    else:
+        logger.warning(f"More than {MAX_TIMELINE_PAGES} pages of new tweets for user {user_id}, older tweets were skipped")
+    return tweets, None
+
+def _increment_request_count(user_id):
+    """Count a timeline request for user_id in the current rate-limit window"""
+    now = datetime.now()
+    window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
+    with _request_count_lock:
+        counts = user_request_counts.get(user_id)
+        if counts is None or counts['first_request_time'] < window_start:
+            counts = user_request_counts[user_id] = {'count': 0, 'first_request_time': now}
+        counts['count'] += 1
+        request_timestamps.append(now)
+        while request_timestamps[0] < window_start:
+            request_timestamps.popleft()
+
+def _fetch_key(username):
+    return ('fetch', username)
+
+def _single_line(error):
+    return str(error).replace('\n', ' ')
+
+def _elapsed_ms(started):
+    return round((time.monotonic() - started) * 1000, 1)
 
 # Tweet processing
 
-def _process_tweet(client, tweet, account, user_id, auto_reply):
+def _start_reply(account, tweet, auto_reply):
+    """Queue a tweet for generation (and approval without auto_reply), returns a Future of the reply text.
+
+    The Future resolves to None if the reply was rejected at the approval prompt.
+    """
+    _info_message(f"Tweet replying to: {tweet.text}", event='tweet', account=account['username'], tweet_id=tweet.id)
+    queued_tweet_ids.add(tweet.id)
+    reply = generation_stage.submit(account, tweet)
+    if auto_reply:
+        return reply
+    # One approval worker, the console can only ask about one reply at a time
+    return chain(reply, approval_stage, account, tweet)
+
+def _generate_reply(account, tweet):
+    started = time.monotonic()
+    reply_text = _handle_reply(account, tweet, True)
+    logger.info(f"Generated reply for tweet {tweet.id}", extra={'event': 'generate', 'account': account['username'],
+                                                                'tweet_id': tweet.id, 'latency_ms': _elapsed_ms(started)})
+    return reply_text
+
+def _queue_reply(clients, account, tweet, reply):
     username = account['username']
-    
-    if tweet.id not in replied_tweet_ids:
-        try:
-            _info_message(f"Tweet replying to: {tweet.text}")
-            reply_text = _handle_reply(account, tweet, auto_reply)
-            if reply_text:
-                _post_reply(client, username, tweet.id, user_id, reply_text, auto_reply)
-            else:
-                _error_message("No predefined replies available and chatgpt either not working or not selected, unable to post tweet!")
-            replied_tweet_ids.add(tweet.id)
-            if '_tweet_count_callback' in globals():
-                _tweet_count_callback(len(replied_tweet_ids))
-        except tweepy.errors.TooManyRequests as e:
-            _error_message(f"Too many requests! Waiting 15 minutes...")
-            time.sleep(15*60)
-        except tweepy.errors.TweepyException as e:
-            _error_message(f"Tweepy error while replying to @{account}: {e}")
-        except Exception as e:
-            _error_message(f"General error while replying to @{account}: {e}")
-
-def _post_reply(client, username, tweet_id, user_id, reply_text, auto_reply):
-    if not auto_reply:
-        if input(f"Would you like to post this tweet?: \"@{username} {reply_text}\" (y/n): ") != 'y':
-            logger.info("Skipping tweet...")
-            return
-    
-    _info_message(f"Posting tweet: \"@{username} {reply_text}\"")
     try:
-        client.create_tweet(text=f"@{username} {reply_text}", in_reply_to_tweet_id=tweet_id, user_auth=True)
+        reply_text = reply.result()
+    except Exception as e:
+        queued_tweet_ids.discard(tweet.id)
+        _settle_tweet(tweet.id)
+        tweet_counter.inc(account=username, outcome='errored')
+        _error_message(f"General error while replying to @{username}: {e}", event='generate_error', account=username, tweet_id=tweet.id)
+        return
+    if reply_text is None:
+        logger.info("Skipping tweet...")
+        tweet_counter.inc(account=username, outcome='skipped')
+        _mark_replied(tweet.id)
+    elif reply_text:
+        scheduler.call_when_ready(POST_ACTION, _post_reply, clients, username, tweet.id, reply_text)
+    else:
+        tweet_counter.inc(account=username, outcome='errored')
+        _error_message("No predefined replies available and chatgpt either not working or not selected, unable to post tweet!",
+                       event='generate_error', account=username, tweet_id=tweet.id)
+        _mark_replied(tweet.id)
+
+def _post_reply(clients, username, tweet_id, reply_text):
+    client = clients.acquire(POST_ENDPOINT)
+    if client is None:
+        _requeue_post(clients.delay(POST_ENDPOINT), clients, username, tweet_id, reply_text)
+        return
+
+    _info_message(f"Posting tweet: \"@{username} {reply_text}\"", event='post_start', account=username, tweet_id=tweet_id)
+    started = time.monotonic()
+    try:
+        with api_latency.time(call='create_tweet'):
+            client.create_tweet(text=f"@{username} {reply_text}", in_reply_to_tweet_id=tweet_id, user_auth=True)
+        post_metrics.record(time.monotonic() - started)
+        tweet_counter.inc(account=username, outcome='replied')
+        _info_message(f"Posted reply to tweet {tweet_id}", event='post', account=username, tweet_id=tweet_id,
+                      latency_ms=_elapsed_ms(started))
     except tweepy.errors.TooManyRequests as e:
-        _error_message(f"Too many requests! Waiting 15 minutes...")
-        time.sleep(15*60)
+        post_metrics.record(time.monotonic() - started, failed=True)
+        _error_message(f"Too many requests while posting reply!", event='rate_limited', account=username, tweet_id=tweet_id)
+        _requeue_post(clients.report_rate_limited(client, POST_ENDPOINT, RATE_LIMIT_WAIT), clients, username, tweet_id, reply_text)
+        return
     except tweepy.errors.TweepyException as e:
-        _error_message(f"Tweepy error while posting reply: {e}")
+        post_metrics.record(time.monotonic() - started, failed=True)
+        if clients.report_error(client, e):
+            # Rejected credentials say nothing about the reply, retry it through another app
+            scheduler.defer(POST_ACTION, clients.delay(POST_ENDPOINT))
+            scheduler.call_when_ready(POST_ACTION, _post_reply, clients, username, tweet_id, reply_text)
+            return
+        tweet_counter.inc(account=username, outcome='errored')
+        _error_message(f"Tweepy error while posting reply: {e}", event='post_error', account=username, tweet_id=tweet_id)
     except Exception as e:
-        _error_message(f"General error while posting reply: {e}")
+        post_metrics.record(time.monotonic() - started, failed=True)
+        tweet_counter.inc(account=username, outcome='errored')
+        _error_message(f"General error while posting reply: {e}", event='post_error', account=username, tweet_id=tweet_id)
+    _mark_replied(tweet_id)
     wait = random.randint(REPLY_WAIT_START, REPLY_WAIT_END)
-    _info_message(f"Waiting for {wait} seconds till next reply...")
-    time.sleep(wait)
+    _info_message(f"Next reply can be posted in {wait} seconds...")
+    scheduler.defer(POST_ACTION, wait)
+
+def _requeue_post(wait, clients, username, tweet_id, reply_text):
+    # Hold every queued post back and retry this one first once the window resets
+    _warning_message(f"Post rate limit reached, pausing posts for {wait:.0f} seconds...")
+    scheduler.defer(POST_ACTION, wait)
+    scheduler.call_when_ready(POST_ACTION, _post_reply, clients, username, tweet_id, reply_text)
+
+def _mark_replied(tweet_id):
+    queued_tweet_ids.discard(tweet_id)
+    reply_store.add(tweet_id)
+    state.record_reply(reply_store.count())
+    _settle_tweet(tweet_id)
+
+# since_id bookkeeping
+
+def _track_tweets(user_id, tweets, complete=True):
+    """Remember fetched tweets, those already in the reply store count as settled.
+
+    complete is False when tweets are only part of the timeline since since_id
+    (resumed or cut short by the rate limit).
+    """
+    fetched_ids = {tweet.id for tweet in tweets}
+    with _fetched_lock:
+        fetched = fetched_tweets.setdefault(user_id, {})
+        # A tweet held back earlier that is no longer served was deleted, or paged out
+        for tweet_id, settled in fetched.items():
+            if complete and not settled and tweet_id not in fetched_ids and tweet_id not in queued_tweet_ids:
+                fetched[tweet_id] = True
+        for tweet in tweets:
+            if tweet.id in fetched:
+                continue
+            fetched[tweet.id] = tweet.id in reply_store
+    _advance_since_id(user_id)
+
+def _settle_tweet(tweet_id):
+    with _fetched_lock:
+        user_id = next((user_id for user_id, fetched in fetched_tweets.items() if tweet_id in fetched), None)
+        if user_id is None:
+            return
+        fetched_tweets[user_id][tweet_id] = True
+    _advance_since_id(user_id)
+
+def _advance_since_id(user_id):
+    """Move user_id's since_id to the newest tweet with nothing older still unsettled"""
+    if user_id in timeline_cursors:
+        return  # Older pages are still to be fetched from the current since_id
+    with _fetched_lock:
+        fetched = fetched_tweets.get(user_id, {})
+        settled = None
+        for tweet_id in sorted(fetched):
+            if not fetched[tweet_id]:
+                break
+            settled = tweet_id
+        if settled is None:
+            return
+        for tweet_id in [tweet_id for tweet_id in fetched if tweet_id <= settled]:
+            del fetched[tweet_id]
+    # Commit replies before moving the high-water mark past them
+    reply_store.flush()
+    since_id_store.advance(user_id, settled)
+    since_id_store.save()
 
 # Interactive functions
 
 def _get_user_approval(reply_text):
     while True:
-        choice = input(f"Is this response ok? {reply_text} (y/n/e - will be regenerated if n - e will edit prompt for this run): ")
-        if choice in ['y', 'n', 'e']:
+        choice = input(f"Is this response ok? {reply_text} (y/n/e/s - will be regenerated if n - e will edit prompt for this run - s skips this tweet): ")
+        if choice in ['y', 'n', 'e', 's']:
             return choice
         else:
             return 'n'
+
+def _approve_reply(account, tweet, reply_text):
+    """Ask on the console whether to post reply_text, returns the reply to post or None to skip the tweet"""
+    if not reply_text:
+        return reply_text
+    if not account['use_gpt']:
+        if input(f"Would you like to post this tweet?: \"@{account['username']} {reply_text}\" (y/n): ") != 'y':
+            return None
+        return reply_text
+    prompt = account['custom_prompt'].format(tweet_text=tweet.text)
+    while True:
+        choice = _get_user_approval(reply_text)
+        if choice == 'y':
+            return reply_text
+        if choice == 's':
+            return None
+        use_cache = choice == 'e'  # A rejected reply must be regenerated, not served from the cache again
+        if choice == 'e':
+            prompt = input("Enter a new prompt using {tweet_text} as a placeholder for the tweet: ").format(tweet_text=tweet.text)
+        reply_text = gpt.get_chatgpt_response(prompt, use_cache=use_cache)
         
 def _handle_reply(account, tweet, auto_reply):
     use_gpt = account['use_gpt']
@@ -126,13 +499,15 @@ def _handle_reply(account, tweet, auto_reply):
     predefined_replies = account['predefined_replies']
     
     if use_gpt:
-        prompt = custom_prompt.format(tweet_text=tweet.text)
-        while not auto_reply:
-            reply_text = gpt.get_chatgpt_response(prompt)
-            choice = _get_user_approval(reply_text)
-            if choice == 'y':
-                return reply_text
-            if choice == 'e':
-                prompt = input("Enter a new prompt using {tweet_text} as a placeholder for the tweet: ").format(tweet_text=tweet.text)
-        return gpt.get_chatgpt_response(prompt)
-    return random.choice(predefined_replies) if predefined_replies else ""
+        reply_text = gpt.get_chatgpt_response(custom_prompt.format(tweet_text=tweet.text))
+    else:
+        reply_text = random.choice(predefined_replies) if predefined_replies else ""
+    if auto_reply:
+        return reply_text
+    return _approve_reply(account, tweet, reply_text)
+
+# Pipeline stages, posting is paced by the scheduler rather than a worker pool
+fetch_stage = Stage('fetch', _fetch_account, FETCH_CONCURRENCY, FETCH_QUEUE_SIZE)
+generation_stage = Stage('generate', _generate_reply, GENERATION_CONCURRENCY, GENERATION_QUEUE_SIZE)
+approval_stage = Stage('approve', _approve_reply, 1, APPROVAL_QUEUE_SIZE)
+post_metrics = StageMetrics('post')